@@ -3,3 +3,12 @@ from django.apps.config import AppConfig
 
 class WagtailnestConfig(AppConfig):
     label = name = 'wagtailnest'
+
+    def ready(self):
+        from django.conf import settings
+        from wagtailnest.signals import register_signal_handlers
+        register_signal_handlers()
+        conf = settings.WAGTAILNEST.TYPED_ATTRS
+        if conf['PRECOMPILE'] or conf['STRICT']:
+            from wagtailnest.endpoints import compile_typed_attrs
+            compile_typed_attrs()
@@ -0,0 +1,272 @@
+"""Helpers for timing wagtailnest against large synthetic page trees."""
+import json
+import os
+import random
+import tracemalloc
+from datetime import timedelta
+from io import BytesIO
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from wagtail.contrib.redirects.models import Redirect
+from wagtail.core.models import Page, PageRevision, PageViewRestriction
+from wagtail.documents.models import get_document_model
+from wagtail.images import get_image_model
+
+
+def generate_page_tree(root, count, fanout=20, restrict_every=10,
+                       depth=None):
+    """Bulk-create up to ``count`` live pages under ``root``, breadth first.
+
+    Tree paths are computed directly instead of through ``add_child``, so
+    100k pages take seconds rather than minutes. No level goes deeper than
+    ``depth`` below ``root``. Every ``restrict_every``th new child of
+    ``root`` gets a login view restriction covering its section. Returns a
+    queryset of the generated pages.
+    """
+    content_type = ContentType.objects.get_for_model(Page)
+    last_child = root.get_last_child()
+    # pylint: disable=protected-access
+    first_step = Page._str2int(
+        last_child.path[-Page.steplen:]) + 1 if last_child else 1
+    pages = []
+    parents = [root]
+    while len(pages) < count and parents:
+        if depth is not None and parents[0].depth >= root.depth + depth:
+            break
+        level = []
+        for parent in parents:
+            step = first_step if parent is root else 1
+            for _ in range(min(fanout, count - len(pages))):
+                slug = 'bench-{}'.format(len(pages))
+                page = Page(
+                    title=slug, draft_title=slug, slug=slug, live=True,
+                    content_type=content_type, depth=parent.depth + 1,
+                    path=Page._get_path(parent.path, parent.depth + 1, step),
+                    url_path='{}{}/'.format(parent.url_path, slug),
+                    numchild=0)
+                parent.numchild += 1
+                step += 1
+                pages.append(page)
+                level.append(page)
+        parents = level
+    Page.objects.bulk_create(pages, batch_size=1000)
+    Page.objects.filter(pk=root.pk).update(numchild=root.numchild)
+    generated = Page.objects.filter(
+        path__startswith=root.path, depth__gt=root.depth,
+        slug__startswith='bench-')
+    if restrict_every:
+        top = generated.filter(depth=root.depth + 1).order_by('path')
+        PageViewRestriction.objects.bulk_create([
+            PageViewRestriction(
+                page=page, restriction_type=PageViewRestriction.LOGIN)
+            for page in list(top)[::restrict_every]])
+    return generated
+
+
+def generate_typed_pages(parent_ids, models, count):
+    """Add ``count`` pages of ``models`` in turn, spread over parents.
+
+    These go through ``add_child`` so each type's own table is filled;
+    the models must be creatable from a title and slug alone.
+    """
+    created = []
+    for index in range(count):
+        model = models[index % len(models)]
+        # A fresh parent each time, as add_child relies on its numchild
+        parent = Page.objects.get(pk=parent_ids[index % len(parent_ids)])
+        # pylint: disable=protected-access
+        slug = 'bench-{}-{}'.format(model._meta.model_name, index)
+        created.append(parent.add_child(
+            instance=model(title=slug, slug=slug, live=True)))
+    return created
+
+
+def generate_revisions(pages, per_page):
+    """Give each of ``pages`` ``per_page`` revisions, an hour apart."""
+    now = timezone.now()
+    revisions = []
+    for page in pages:
+        content_json = page.specific.to_json()
+        for index in range(per_page):
+            revisions.append(PageRevision(
+                page_id=page.pk, content_json=content_json,
+                created_at=now - timedelta(hours=index)))
+    PageRevision.objects.bulk_create(revisions, batch_size=1000)
+    Page.objects.filter(pk__in=[page.pk for page in pages]).update(
+        latest_revision_created_at=now)
+    return len(revisions)
+
+
+def generate_redirects(site, pages, count):
+    """Create ``count`` redirects for ``site`` pointing at ``pages``."""
+    page_ids = [page.pk for page in pages]
+    Redirect.objects.bulk_create([
+        Redirect(
+            site=site, old_path='/bench-redirect-{}'.format(index),
+            redirect_page_id=page_ids[index % len(page_ids)])
+        for index in range(count)], batch_size=1000)
+
+
+def make_png(size, seed=0):
+    from PIL import Image as PILImage
+    buffer = BytesIO()
+    color = tuple(random.Random(seed).randrange(256) for _ in range(3))
+    PILImage.new('RGB', (size, size), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def generate_images(count, size=800):
+    """Create ``count`` square PNG images of ``size`` pixels."""
+    Image = get_image_model()  # pylint: disable=invalid-name
+    images = []
+    for index in range(count):
+        image = Image(title='bench-{}'.format(index), width=size, height=size)
+        image.file.save(
+            'bench-{}.png'.format(index), ContentFile(make_png(size, index)),
+            save=False)
+        image.save()
+        images.append(image)
+    return images
+
+
+def generate_documents(count, size=1024 * 1024):
+    """Create ``count`` documents of ``size`` random bytes."""
+    Document = get_document_model()  # pylint: disable=invalid-name
+    documents = []
+    for index in range(count):
+        document = Document(title='bench-{}'.format(index))
+        document.file.save(
+            'bench-{}.bin'.format(index), ContentFile(os.urandom(size)),
+            save=False)
+        document.save()
+        documents.append(document)
+    return documents
+
+
+def delete_files(images, documents):
+    """Remove generated files and renditions, which rollback leaves."""
+    for image in images:
+        for rendition in image.renditions.all():
+            rendition.file.delete(save=False)
+        image.file.delete(save=False)
+    for document in documents:
+        document.file.delete(save=False)
+
+
+def create_benchmark_user():
+    User = get_user_model()  # pylint: disable=invalid-name
+    user = User(**{User.USERNAME_FIELD: 'wagtailnest-benchmark@example.com'})
+    user.is_staff = user.is_superuser = True
+    user.set_unusable_password()
+    user.save()
+    return user
+
+
+def time_call(func, iterations):
+    """Call ``func`` repeatedly; returns the timings in ms, fastest first."""
+    timings = []
+    for _ in range(iterations):
+        started = perf_counter()
+        func()
+        timings.append((perf_counter() - started) * 1000)
+    return sorted(timings)
+
+
+def percentile(timings, fraction):
+    """Nearest-rank percentile of sorted ``timings``."""
+    if not timings:
+        return 0.0
+    index = max(int(round(fraction * len(timings))) - 1, 0)
+    return timings[min(index, len(timings) - 1)]
+
+
+def fetch(client, url):
+    """GET ``url`` and read the whole body, streamed or not."""
+    response = client.get(url)
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    response.close()
+    return response
+
+
+def run_scenario(client, urls, iterations, warmup=0, memory=0):
+    """Request ``urls`` round-robin and summarise latency and queries.
+
+    Queries are counted with the connection's debug cursor, for every
+    request including the timed ones. With ``memory``, that many further
+    requests run under tracemalloc to find the peak allocation; they are
+    kept out of the timings as tracing slows everything down.
+    """
+    for index in range(warmup):
+        fetch(client, urls[index % len(urls)])
+    timings = []
+    queries = []
+    errors = 0
+    for index in range(iterations):
+        with CaptureQueriesContext(connection) as context:
+            started = perf_counter()
+            response = fetch(client, urls[index % len(urls)])
+            timings.append((perf_counter() - started) * 1000)
+        queries.append(len(context.captured_queries))
+        if response.status_code >= 400:
+            errors += 1
+    peak = 0
+    for index in range(memory):
+        tracemalloc.start()
+        try:
+            fetch(client, urls[index % len(urls)])
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+    timings.sort()
+    return {
+        'requests': iterations,
+        'errors': errors,
+        'mean': sum(timings) / len(timings) if timings else 0.0,
+        'p50': percentile(timings, 0.5),
+        'p90': percentile(timings, 0.9),
+        'p99': percentile(timings, 0.99),
+        'max': timings[-1] if timings else 0.0,
+        'queries': sum(queries) / len(queries) if queries else 0.0,
+        'queries_max': max(queries) if queries else 0,
+        'peak_kb': peak / 1024 if memory else None,
+    }
+
+
+def compare_results(baseline, results, threshold=0.1,
+                    metrics=('p50', 'p90', 'queries')):
+    """Yield ``(scenario, metric, old, new, regressed)`` for shared runs.
+
+    A timing regresses when it grows by more than ``threshold`` (a
+    fraction), a query count when it grows by half a query on average.
+    """
+    for scenario in sorted(set(baseline) & set(results)):
+        for metric in metrics:
+            old = baseline[scenario].get(metric)
+            new = results[scenario].get(metric)
+            if old is None or new is None:
+                continue
+            if metric.startswith('queries'):
+                limit = old + 0.5
+            else:
+                limit = old * (1 + threshold)
+            yield (scenario, metric, old, new, new > limit)
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as handle:
+        return json.load(handle)['scenarios']
+
+
+def save_results(path, results, meta):
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump(
+            {'meta': meta, 'scenarios': results}, handle, indent=2,
+            sort_keys=True)
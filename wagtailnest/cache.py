@@ -0,0 +1,356 @@
+"""In-process and shared caches used by the API endpoints."""
+from collections import OrderedDict
+from hashlib import sha1
+from threading import RLock
+from time import monotonic
+
+from django.conf import settings
+from django.core.cache import caches
+
+from wagtailnest.instrumentation import count_lookup
+
+
+class LRUCache:
+    """A small thread-safe least-recently-used mapping.
+
+    Entries are bounded by count and, when ``maxbytes`` is given, by the
+    total of the sizes passed to ``set``.
+    """
+
+    def __init__(self, maxsize=1024, maxbytes=None):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.currbytes = 0
+        self._data = OrderedDict()  # type: OrderedDict
+        self._sizes = {}  # type: dict
+        self._lock = RLock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def _full(self):
+        if len(self._data) > self.maxsize:
+            return True
+        return self.maxbytes is not None and self.currbytes > self.maxbytes
+
+    def set(self, key, value, size=0):
+        with self._lock:
+            self.pop(key)
+            self._data[key] = value
+            self._sizes[key] = size
+            self.currbytes += size
+            while self._data and self._full():
+                self.pop(next(iter(self._data)))
+
+    def pop(self, key, default=None):
+        with self._lock:
+            self.currbytes -= self._sizes.pop(key, 0)
+            return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.currbytes = 0
+
+
+def get_cache_backend(alias):
+    """Return the Django cache named by ``alias``, or None if unset."""
+    return caches[alias] if alias else None
+
+
+class GenerationalCache:
+    """A local LRU, optionally backed by a shared Django cache.
+
+    Invalidation bumps a generation number so every process drops its
+    entries at once, without needing to know which keys were affected.
+    Without a shared cache only the invalidating process sees the bump, so
+    ``local_timeout`` bounds how long the others keep serving old entries.
+    """
+
+    key_prefix = 'wagtailnest'
+
+    def __init__(self, backend=None, maxsize=10000, local_timeout=None):
+        self.backend = backend
+        self.local_timeout = local_timeout
+        self._local = LRUCache(maxsize)
+        self._generation = 0
+
+    @property
+    def generation(self):
+        if self.backend is None:
+            return self._generation
+        key = '{}:generation'.format(self.key_prefix)
+        return self.backend.get_or_set(key, 0, None)
+
+    def _key(self, key):
+        return '{}:{}:{}'.format(self.key_prefix, self.generation, key)
+
+    def _get_local(self, key):
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires is not None and expires < monotonic():
+            self._local.pop(key)
+            return None
+        return value
+
+    def _set_local(self, key, value):
+        expires = None
+        if self.local_timeout is not None:
+            expires = monotonic() + self.local_timeout
+        self._local.set(key, (expires, value))
+
+    def get(self, key):
+        key = self._key(key)
+        value = self._get_local(key)
+        if value is None and self.backend is not None:
+            value = self.backend.get(key)
+            if value is not None:
+                self._set_local(key, value)
+        count_lookup(self.key_prefix.rsplit(':', 1)[-1], value is not None)
+        return value
+
+    def set(self, key, value):
+        key = self._key(key)
+        self._set_local(key, value)
+        if self.backend is not None:
+            self.backend.set(key, value, None)
+
+    def clear(self):
+        self._local.clear()
+        self._generation += 1
+        if self.backend is not None:
+            key = '{}:generation'.format(self.key_prefix)
+            try:
+                self.backend.incr(key)
+            except ValueError:
+                self.backend.set(key, 1, None)
+
+
+class RouteCache(GenerationalCache):
+    """Map a site's cleaned url_path to ``(page_id, content_type_id)``."""
+
+    key_prefix = 'wagtailnest:routes'
+
+    # pylint: disable=arguments-differ
+    def get(self, site_id, url_path):
+        return super().get('{}:{}'.format(site_id, url_path))
+
+    def set(self, site_id, url_path, page_id, content_type_id):
+        super().set(
+            '{}:{}'.format(site_id, url_path), (page_id, content_type_id))
+
+
+class PermissionCache(GenerationalCache):
+    """Map a user id to ``(all_pages, path_prefixes)`` they can publish."""
+
+    key_prefix = 'wagtailnest:permissions'
+
+
+class RenditionCache(GenerationalCache):
+    """Map an image file and filter spec to ``(url, width, height)``."""
+
+    key_prefix = 'wagtailnest:renditions'
+
+    @staticmethod
+    def image_key(image, filter_spec):
+        # Older Wagtail images have no file_hash; a replaced file is renamed
+        file_hash = getattr(image, 'file_hash', '') or image.file.name
+        parts = '{}:{}:{}'.format(image.pk, file_hash, filter_spec)
+        return sha1(parts.encode('utf-8')).hexdigest()
+
+    # pylint: disable=arguments-differ
+    def get(self, image, filter_spec):
+        return super().get(self.image_key(image, filter_spec))
+
+    def set(self, image, filter_spec, url, width, height):
+        super().set(self.image_key(image, filter_spec), (url, width, height))
+
+
+class ResponseCache:
+    """Serialized API responses with their ETag, keyed by page and variant.
+
+    Each page has a version number in the shared cache which ``purge``
+    bumps, orphaning every variant cached for that page.
+    """
+
+    key_prefix = 'wagtailnest:responses'
+
+    def __init__(self, backend, timeout=None):
+        self.backend = backend
+        self.timeout = timeout
+
+    def _version_key(self, page_id):
+        return '{}:{}:version'.format(self.key_prefix, page_id)
+
+    def _key(self, page_id, variant):
+        version = self.backend.get_or_set(self._version_key(page_id), 0, None)
+        digest = sha1(repr(variant).encode('utf-8')).hexdigest()
+        return '{}:{}:{}:{}'.format(self.key_prefix, page_id, version, digest)
+
+    def get(self, page_id, variant):
+        value = self.backend.get(self._key(page_id, variant))
+        count_lookup('responses', value is not None)
+        return value
+
+    def set(self, page_id, variant, value):
+        self.backend.set(self._key(page_id, variant), value, self.timeout)
+
+    def purge(self, page_id):
+        try:
+            self.backend.incr(self._version_key(page_id))
+        except ValueError:
+            self.backend.set(self._version_key(page_id), 1, None)
+
+
+class SiteRegistry:
+    """Remember the default Site and its root page url_path per hostname.
+
+    ``hits`` and ``misses`` count lookups so the registry can be checked in
+    production; ``clear`` is called when a Site or a root Page is saved.
+    That only reaches the saving process, so entries are also dropped
+    after ``local_timeout`` seconds.
+    """
+
+    def __init__(self, local_timeout=None):
+        self.local_timeout = local_timeout
+        self._entries = {}  # type: dict
+        self._lock = RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, hostname, resolve):
+        entry = self._entries.get(hostname)
+        if entry is not None and entry[2] is not None and (
+                entry[2] < monotonic()):
+            entry = None
+        count_lookup('sites', entry is not None)
+        with self._lock:
+            if entry is not None:
+                self.hits += 1
+                return entry
+            self.misses += 1
+            site = resolve()
+            if site is None:
+                return (None, None, None)
+            expires = None
+            if self.local_timeout is not None:
+                expires = monotonic() + self.local_timeout
+            entry = (site, site.root_page.url_path, expires)
+            self._entries[hostname] = entry
+        return entry
+
+    def get_site(self, hostname, resolve):
+        return self._get(hostname, resolve)[0]
+
+    def get_root_url_path(self, hostname, resolve):
+        return self._get(hostname, resolve)[1]
+
+    def is_root_page(self, page_id):
+        return any(
+            site.root_page_id == page_id
+            for site, _, _ in list(self._entries.values()))
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self._entries),
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+site_registry = SiteRegistry(
+    settings.WAGTAILNEST.SITE_REGISTRY['LOCAL_TIMEOUT'])
+_route_cache = None
+_response_cache = None
+_permission_cache = None
+_revision_cache = None
+_rendition_cache = None
+_signature_cache = None
+
+
+def get_route_cache():
+    """Return the process-wide RouteCache, or None when disabled."""
+    global _route_cache  # pylint: disable=global-statement
+    conf = settings.WAGTAILNEST.ROUTE_CACHE
+    if not conf['ENABLED']:
+        return None
+    if _route_cache is None:
+        _route_cache = RouteCache(
+            get_cache_backend(conf['BACKEND']), conf['MAX_ENTRIES'],
+            conf['LOCAL_TIMEOUT'])
+    return _route_cache
+
+
+def get_response_cache():
+    """Return the process-wide ResponseCache, or None when disabled."""
+    global _response_cache  # pylint: disable=global-statement
+    conf = settings.WAGTAILNEST.RESPONSE_CACHE
+    if not conf['ENABLED']:
+        return None
+    if _response_cache is None:
+        _response_cache = ResponseCache(
+            get_cache_backend(conf['BACKEND']), conf['TIMEOUT'])
+    return _response_cache
+
+
+def get_permission_cache():
+    """Return the process-wide PermissionCache, or None when disabled."""
+    global _permission_cache  # pylint: disable=global-statement
+    conf = settings.WAGTAILNEST.PERMISSION_CACHE
+    if not conf['ENABLED']:
+        return None
+    if _permission_cache is None:
+        _permission_cache = PermissionCache(
+            get_cache_backend(conf['BACKEND']), conf['MAX_ENTRIES'],
+            conf['LOCAL_TIMEOUT'])
+    return _permission_cache
+
+
+def get_revision_cache():
+    """Return the process-wide decoded revision LRU, or None when disabled."""
+    global _revision_cache  # pylint: disable=global-statement
+    conf = settings.WAGTAILNEST.REVISION_CACHE
+    if not conf['ENABLED']:
+        return None
+    if _revision_cache is None:
+        _revision_cache = LRUCache(conf['MAX_ENTRIES'], conf['MAX_BYTES'])
+    return _revision_cache
+
+
+def get_rendition_cache():
+    """Return the process-wide RenditionCache, or None when disabled."""
+    global _rendition_cache  # pylint: disable=global-statement
+    conf = settings.WAGTAILNEST.RENDITION_CACHE
+    if not conf['ENABLED']:
+        return None
+    if _rendition_cache is None:
+        _rendition_cache = RenditionCache(
+            get_cache_backend(conf['BACKEND']), conf['MAX_ENTRIES'])
+    return _rendition_cache
+
+
+def get_signature_cache():
+    """Return the process-wide LRU of image URL signatures."""
+    global _signature_cache  # pylint: disable=global-statement
+    if _signature_cache is None:
+        _signature_cache = LRUCache(
+            settings.WAGTAILNEST.IMAGE_SIGNATURES['MAX_ENTRIES'])
+    return _signature_cache
@@ -17,12 +17,65 @@ class Config(BaseConfig):
         ('WAGTAILNEST__API_ENDPOINTS__DOCS', 'wagtailnest.endpoints.WTNDocumentsAPIEndpoint'),
         ('WAGTAILNEST__API_ENDPOINTS__IMAGES', 'wagtailnest.endpoints.WTNImagesAPIEndpoint'),
         ('WAGTAILNEST__API_ENDPOINTS__PAGES', 'wagtailnest.endpoints.WTNPagesAPIEndpoint'),
+        ('WAGTAILNEST__API_ENDPOINTS__PAGES_BATCH', 'wagtailnest.endpoints.WTNPagesBatchAPIEndpoint'),
         ('WAGTAILNEST__API_ENDPOINTS__PAGE_REVS', 'wagtailnest.endpoints.WTNPageRevisionsAPIEndpoint'),
         ('WAGTAILNEST__API_ENDPOINTS__REDIRECTS', 'wagtailnest.endpoints.WTNRedirectsAPIEndpoint'),
         ('WAGTAILNEST__API_USER_PERMISSION_APPS', []),
         ('WAGTAILNEST__DOCUMENT_PERMISSION_CLASSES', None),
         ('WAGTAILNEST__IMAGE_PERMISSION_CLASSES', None),
         ('WAGTAILNEST__PAGE_PERMISSION_CLASSES', None),
+        ('WAGTAILNEST__SITE_REGISTRY__LOCAL_TIMEOUT', 60),
+        ('WAGTAILNEST__ROUTE_CACHE__ENABLED', True),
+        ('WAGTAILNEST__ROUTE_CACHE__BACKEND', ''),
+        ('WAGTAILNEST__ROUTE_CACHE__MAX_ENTRIES', 10000),
+        ('WAGTAILNEST__ROUTE_CACHE__LOCAL_TIMEOUT', 60),
+        ('WAGTAILNEST__RESPONSE_CACHE__ENABLED', False),
+        ('WAGTAILNEST__RESPONSE_CACHE__BACKEND', 'default'),
+        ('WAGTAILNEST__RESPONSE_CACHE__TIMEOUT', 300),
+        ('WAGTAILNEST__DOCUMENTS__STREAMING', False),
+        ('WAGTAILNEST__DOCUMENTS__ACCEL', ''),
+        ('WAGTAILNEST__DOCUMENTS__ACCEL_PREFIX', '/protected/'),
+        ('WAGTAILNEST__IMAGE_SIGNATURES__MAX_ENTRIES', 10000),
+        ('WAGTAILNEST__PERMISSION_CACHE__ENABLED', True),
+        ('WAGTAILNEST__PERMISSION_CACHE__BACKEND', ''),
+        ('WAGTAILNEST__PERMISSION_CACHE__MAX_ENTRIES', 10000),
+        ('WAGTAILNEST__PERMISSION_CACHE__LOCAL_TIMEOUT', 30),
+        ('WAGTAILNEST__RENDITION_CACHE__ENABLED', True),
+        ('WAGTAILNEST__RENDITION_CACHE__BACKEND', ''),
+        ('WAGTAILNEST__RENDITION_CACHE__MAX_ENTRIES', 10000),
+        ('WAGTAILNEST__REDIRECTS__BACKEND', ''),
+        ('WAGTAILNEST__RENDITIONS__ASYNC', False),
+        ('WAGTAILNEST__RENDITIONS__QUEUE', 'wagtailnest.renditions.ThreadPoolRenditionQueue'),
+        ('WAGTAILNEST__RENDITIONS__WORKERS', 2),
+        ('WAGTAILNEST__RENDITIONS__LOCK_BACKEND', ''),
+        ('WAGTAILNEST__RENDITIONS__PLACEHOLDER', 'original'),
+        ('WAGTAILNEST__REVISION_CACHE__ENABLED', True),
+        ('WAGTAILNEST__REVISION_CACHE__MAX_ENTRIES', 1000),
+        ('WAGTAILNEST__REVISION_CACHE__MAX_BYTES', 64 * 1024 * 1024),
+        ('WAGTAILNEST__EMBED_CACHE__ENABLED', True),
+        ('WAGTAILNEST__EMBED_CACHE__MAX_ENTRIES', 1000),
+        ('WAGTAILNEST__EMBED_CACHE__MAX_AGE', 24 * 60 * 60),
+        ('WAGTAILNEST__EMBED_CACHE__NEGATIVE_TTL', 5 * 60),
+        ('WAGTAILNEST__EMBED_CACHE__TIMEOUT', 2.0),
+        ('WAGTAILNEST__EMBED_CACHE__WORKERS', 2),
+        ('WAGTAILNEST__PUBLIC_PAGE_INDEX__ENABLED', False),
+        ('WAGTAILNEST__INSTRUMENTATION__ENABLED', False),
+        ('WAGTAILNEST__INSTRUMENTATION__SINKS', ['wagtailnest.instrumentation.LoggingSink']),
+        ('WAGTAILNEST__INSTRUMENTATION__SERVER_TIMING', False),
+        ('WAGTAILNEST__INSTRUMENTATION__STATSD_HOST', '127.0.0.1'),
+        ('WAGTAILNEST__INSTRUMENTATION__STATSD_PORT', 8125),
+        ('WAGTAILNEST__INSTRUMENTATION__STATSD_PREFIX', 'wagtailnest'),
+        ('WAGTAILNEST__INSTRUMENTATION__METRICS_IPS', []),
+        ('WAGTAILNEST__PAGES_BATCH__MAX_ITEMS', 50),
+        ('WAGTAILNEST__PROJECTION__ENABLED', False),
+        ('WAGTAILNEST__RICHTEXT_CACHE__MAX_ENTRIES', 1000),
+        ('WAGTAILNEST__RICHTEXT_CACHE__MAX_BYTES', 16 * 1024 * 1024),
+        ('WAGTAILNEST__RICHTEXT_CACHE__LOCAL_TIMEOUT', 60),
+        ('WAGTAILNEST__SNAPSHOT__DIRECTORY', None),
+        ('WAGTAILNEST__SNAPSHOT__ON_PUBLISH', False),
+        ('WAGTAILNEST__SNAPSHOT__COMPRESS', ['gzip', 'br']),
+        ('WAGTAILNEST__TYPED_ATTRS__PRECOMPILE', False),
+        ('WAGTAILNEST__TYPED_ATTRS__STRICT', False),
     ])
     defaults.INSTALLED_APPS_REQUIRED = [
         'dj_core_drf',
@@ -48,5 +101,5 @@ class Config(BaseConfig):
     def get_middleware(self, settings):
         return super().get_middleware(settings) + [
             'wagtail.core.middleware.SiteMiddleware',
-            'wagtail.contrib.redirects.middleware.RedirectMiddleware',
+            'wagtailnest.redirects.RedirectMiddleware',
         ]
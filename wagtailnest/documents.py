@@ -0,0 +1,181 @@
+"""Range-aware, conditional document serving."""
+import mimetypes
+import os
+import re
+from calendar import timegm
+from hashlib import sha1
+
+from django.conf import settings
+from django.http import (FileResponse, Http404, HttpResponse,
+                         StreamingHttpResponse)
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from wagtail.core import hooks
+from wagtail.documents.models import document_served, get_document_model
+
+RANGE_RE = re.compile(r'^\s*bytes=(\d*)-(\d*)\s*$')
+# As FileResponse: compressed downloads are files, not transfer encodings
+ENCODING_TYPES = {
+    'bzip2': 'application/x-bzip',
+    'gzip': 'application/gzip',
+    'xz': 'application/x-xz',
+}
+
+
+class RangeFileWrapper:
+    """Iterate over ``length`` bytes of a file, starting at ``offset``."""
+
+    def __init__(self, filelike, offset, length, block_size=64 * 1024):
+        self.filelike = filelike
+        self.filelike.seek(offset)
+        self.remaining = length
+        self.block_size = block_size
+
+    def __iter__(self):
+        while self.remaining > 0:
+            data = self.filelike.read(min(self.remaining, self.block_size))
+            if not data:
+                break
+            self.remaining -= len(data)
+            yield data
+
+    def close(self):
+        self.filelike.close()
+
+
+def get_local_path(doc):
+    try:
+        return doc.file.path
+    except NotImplementedError:
+        return None  # Storage without filesystem paths, e.g. S3
+
+
+def get_document_etag(doc, stat=None):
+    """Build a strong ETag from the file hash, or the file's identity.
+
+    Documents without a ``file_hash`` use the stored name, size and mtime,
+    so large files never need to be read just to answer a request.
+    """
+    file_hash = getattr(doc, 'file_hash', '')
+    if not file_hash:
+        parts = [doc.file.name]
+        if stat is not None:
+            parts += [str(stat.st_size), str(int(stat.st_mtime))]
+        file_hash = sha1(':'.join(parts).encode('utf-8')).hexdigest()
+    return quote_etag(file_hash)
+
+
+def parse_range(header, size):
+    """Parse a single ``bytes=`` range into ``(start, end)``, inclusive.
+
+    Returns None when the header should be ignored (absent, malformed or
+    multi-range) and raises ValueError when it can't be satisfied.
+    """
+    match = RANGE_RE.match(header or '')
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:  # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError('Empty suffix range')
+        return (max(size - length, 0), size - 1)
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError('Range not satisfiable')
+    return (start, end)
+
+
+def if_range_passes(request, etag, last_modified):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def get_accel_response(local_path, doc):
+    """Hand the bytes to the web server via X-Accel-Redirect/X-Sendfile."""
+    conf = settings.WAGTAILNEST.DOCUMENTS
+    response = HttpResponse()
+    if conf['ACCEL'] == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = '{}/{}'.format(
+            conf['ACCEL_PREFIX'].rstrip('/'), doc.file.name.lstrip('/'))
+    else:
+        response['X-Sendfile'] = local_path
+    return response
+
+
+def get_file_response(request, doc, size, etag, last_modified):
+    """Stream the whole file, or the requested range of it."""
+    try:
+        byte_range = None
+        if if_range_passes(request, etag, last_modified):
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = 'bytes */{}'.format(size)
+        return response
+    doc.file.open('rb')
+    if byte_range is None:
+        response = FileResponse(doc.file)
+        response['Content-Length'] = size
+        return response
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        RangeFileWrapper(doc.file, start, end - start + 1), status=206)
+    response['Content-Length'] = end - start + 1
+    response['Content-Range'] = 'bytes {}-{}/{}'.format(start, end, size)
+    return response
+
+
+def serve(request, document_id, document_filename):
+    """Serve a document like Wagtail's view, with ranges and validators."""
+    Document = get_document_model()  # pylint: disable=invalid-name
+    doc = get_object_or_404(Document, id=document_id)
+    if doc.filename != document_filename:
+        raise Http404('This document does not match the given filename.')
+
+    for func in hooks.get_hooks('before_serve_document'):
+        result = func(doc, request)
+        if isinstance(result, HttpResponse):
+            return result
+
+    document_served.send(sender=Document, instance=doc, request=request)
+
+    local_path = get_local_path(doc)
+    stat = None
+    if local_path:
+        try:
+            stat = os.stat(local_path)
+        except OSError:
+            raise Http404('Document file not found.')
+    etag = get_document_etag(doc, stat)
+    if stat is not None:
+        last_modified = int(stat.st_mtime)
+    else:
+        last_modified = timegm(doc.created_at.utctimetuple())
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if response is None:
+        if local_path and settings.WAGTAILNEST.DOCUMENTS['ACCEL']:
+            response = get_accel_response(local_path, doc)
+        else:
+            size = stat.st_size if stat is not None else doc.file.size
+            response = get_file_response(
+                request, doc, size, etag, last_modified)
+        content_type, encoding = mimetypes.guess_type(doc.filename)
+        response['Content-Type'] = ENCODING_TYPES.get(
+            encoding, content_type) or 'application/octet-stream'
+        response['Content-Disposition'] = 'attachment; filename={}'.format(
+            doc.filename)
+        response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
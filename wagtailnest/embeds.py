@@ -0,0 +1,171 @@
+"""Cached embed lookups that keep provider calls off the request path."""
+import logging
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from wagtail.embeds.embeds import get_embed
+from wagtail.embeds.exceptions import EmbedException
+from wagtail.embeds.models import Embed
+
+from wagtailnest.cache import LRUCache
+from wagtailnest.instrumentation import count
+
+logger = logging.getLogger(__name__)
+
+
+class EmbedCache:
+    """Embeds by URL in an LRU in front of the Embed table.
+
+    Lookups of a URL that isn't stored share one provider call, run on a
+    small thread pool and waited on for at most ``timeout`` seconds; a slow
+    call keeps going and fills the cache for later requests. Entries older
+    than ``max_age``, duplicated or without a thumbnail are re-fetched in
+    the background while the stored embed is still served. URLs whose
+    fetch failed are not retried for ``negative_ttl`` seconds.
+    """
+
+    def __init__(self, maxsize=1000, max_age=86400, negative_ttl=300,
+                 timeout=2.0, max_workers=2):
+        self.entries = LRUCache(maxsize)
+        self.failures = LRUCache(maxsize)
+        self.max_age = max_age
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._pending = {}  # type: dict
+        self._lock = Lock()
+
+    @staticmethod
+    def fetch(url, replace=False):
+        """Return the stored embed for ``url``, asking the provider if none.
+
+        With ``replace``, stored rows are dropped first; the transaction
+        puts them back if the provider call fails.
+        """
+        if not replace:
+            return get_embed(url)
+        with transaction.atomic():
+            Embed.objects.filter(url=url, max_width=None).delete()
+            return get_embed(url)
+
+    def store(self, url, embeds):
+        """Cache the newest of ``url``'s stored rows; returns the entry."""
+        expires_at = monotonic()
+        if embeds[0].thumbnail_url and len(embeds) == 1:
+            expires_at += self.max_age
+        entry = (embeds[0], expires_at)
+        self.entries.set(url, entry)
+        return entry
+
+    def load(self, urls):
+        """Cache the stored embeds for ``urls`` with a single query."""
+        rows = defaultdict(list)  # type: dict
+        embeds = Embed.objects.filter(
+            url__in=urls, max_width=None).order_by('-last_updated', '-pk')
+        for embed in embeds:
+            rows[embed.url].append(embed)
+        return {url: self.store(url, rows[url]) for url in rows}
+
+    def failed(self, url):
+        failed_at = self.failures.get(url)
+        if failed_at is None:
+            return False
+        return monotonic() - failed_at < self.negative_ttl
+
+    def submit(self, url, replace=False):
+        """Start fetching ``url`` unless it is already being fetched."""
+        with self._lock:
+            future = self._pending.get(url)
+            entry = None if replace else self.entries.get(url)
+            if future is None and entry is not None:
+                # Fetched since the caller looked
+                future = Future()
+                future.set_result(entry[0])
+            elif future is None:
+                future = self.executor.submit(self.run, url, replace)
+                self._pending[url] = future
+        return future
+
+    def run(self, url, replace):
+        close_old_connections()
+        embed = None
+        try:
+            embed = self.fetch(url, replace)
+        except EmbedException as err:
+            logger.info('No embed for %s: %r', url, err)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception('Failed to fetch embed for %s', url)
+        finally:
+            # Record the outcome before the future is dropped, so a lookup
+            # never finds neither and starts another provider call
+            if embed is None:
+                self.failures.set(url, monotonic())
+            else:
+                self.failures.pop(url)
+                self.entries.set(url, (embed, monotonic() + self.max_age))
+            with self._lock:
+                self._pending.pop(url, None)
+            close_old_connections()
+        return embed
+
+    def get_many(self, urls):
+        """Return ``{url: Embed or None}`` for several URLs at once.
+
+        Stored embeds are loaded in one query and missing ones fetched
+        concurrently, waiting at most ``timeout`` seconds for all of them.
+        """
+        urls = set(url for url in urls if url)
+        entries = {}
+        for url in urls:
+            entry = self.entries.get(url)
+            if entry is not None:
+                entries[url] = entry
+        missing = urls.difference(entries)
+        count('embeds.hit', len(entries))
+        count('embeds.miss', len(missing))
+        if missing:
+            entries.update(self.load(missing))
+        now = monotonic()
+        embeds = {}
+        futures = {}
+        for url in urls:
+            if url in entries:
+                embeds[url], expires_at = entries[url]
+                if now >= expires_at and not self.failed(url):
+                    self.submit(url, replace=True)
+            elif self.failed(url):
+                embeds[url] = None
+            else:
+                futures[url] = self.submit(url)
+        if futures:
+            wait(futures.values(), timeout=self.timeout)
+        for url, future in futures.items():
+            embeds[url] = future.result() if future.done() else None
+        return embeds
+
+    def get(self, url):
+        """Return the Embed for ``url``, or None if it isn't available."""
+        return self.get_many([url]).get(url)
+
+    def clear(self):
+        self.entries.clear()
+        self.failures.clear()
+
+
+_embed_cache = None
+
+
+def get_embed_cache():
+    """Return the process-wide EmbedCache configured in settings."""
+    global _embed_cache  # pylint: disable=global-statement
+    if _embed_cache is None:
+        conf = settings.WAGTAILNEST.EMBED_CACHE
+        _embed_cache = EmbedCache(
+            maxsize=conf['MAX_ENTRIES'], max_age=conf['MAX_AGE'],
+            negative_ttl=conf['NEGATIVE_TTL'], timeout=conf['TIMEOUT'],
+            max_workers=conf['WORKERS'])
+    return _embed_cache
@@ -1,21 +1,46 @@
-from collections import Iterable
-
+import json
+from calendar import timegm
+from collections import Iterable, OrderedDict
+from hashlib import sha1
+from types import MappingProxyType
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ImproperlyConfigured
+from django.conf.urls import url
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
 from rest_framework.settings import import_from_string
 from wagtail.api.v2.endpoints import BaseAPIEndpoint, PagesAPIEndpoint
 from wagtail.api.v2.filters import FieldsFilter, OrderingFilter, SearchFilter
 from wagtail.api.v2.utils import (BadRequestError, filter_page_type,
-                                  page_models_from_string)
+                                  page_models_from_string,
+                                  parse_fields_parameter)
 from wagtail.contrib.redirects.models import Redirect
-from wagtail.core.models import Page, PageRevision
+from wagtail.core.models import Page, PageRevision, get_page_models
 from wagtail.documents.api.v2.endpoints import DocumentsAPIEndpoint
 from wagtail.images.api.v2.endpoints import ImagesAPIEndpoint
 
+from wagtailnest.cache import (get_response_cache, get_revision_cache,
+                               get_route_cache)
+from wagtailnest.instrumentation import (InstrumentedViewMixin,
+                                         count_lookup, set_action, timer)
+from wagtailnest.models import PublicPage
+from wagtailnest.pagination import CursorPagination
+from wagtailnest.redirect_io import FORMATS, export_rows, import_rows
 from wagtailnest.serializers import (PageRevisionSerializer,
                                      RedirectSerializer, WTNDocumentSerializer,
                                      WTNImageSerializer, WTNPageSerializer)
-from wagtailnest.utils import _clean_rel_url, get_url_path, publishable_pages
+from wagtailnest.utils import (_clean_rel_url, get_deferred_field_names,
+                               get_relation_field_names, get_url_path,
+                               prefetch_embeds, publishable_pages,
+                               specific_pages)
 
 
 def get_urlpath(request):
@@ -30,6 +55,7 @@ def get_urlpath(request):
 
 class ExtraAttrsAPIEndpoint:
     typed_attrs = {}  # type: dict
+    _compiled_typed_attrs = {}  # type: dict
 
     def dispatch(self, request, *args, **kwargs):
         # pylint: disable=attribute-defined-outside-init
@@ -47,39 +73,115 @@ class ExtraAttrsAPIEndpoint:
         return models[0] if len(models) == 1 else Page
 
     @staticmethod
-    def _resolve_object_string(string):
+    def _resolve_object_string(string, strict=False):
         try:
             return import_from_string(string, '')
-        except (AttributeError, ImportError, ValueError):
+        except (AttributeError, ImportError, ValueError) as err:
+            if strict and '.' in string and ' ' not in string:
+                raise ImproperlyConfigured(
+                    'Could not resolve typed_attrs value {!r}: {}'.format(
+                        string, err))
             return string  # If not importable, must be a regular string
 
-    def _resolve_page_type_attr_values(self, value):
+    @classmethod
+    def _resolve_page_type_attr_values(cls, value, strict=False):
         if isinstance(value, str):
-            return self._resolve_object_string(value)
+            return cls._resolve_object_string(value, strict)
         if isinstance(value, Iterable):
-            return [self._resolve_page_type_attr_values(val) for val in value]
+            return [
+                cls._resolve_page_type_attr_values(val, strict)
+                for val in value]
         return value
 
-    def _resolve_page_type_attrs(self, model):
+    @classmethod
+    def _resolve_page_type_attrs(cls, model, strict=False):
         label = getattr(getattr(model, '_meta', None), 'label', None)
-        options = self.typed_attrs.get(model, self.typed_attrs.get(label, {}))
+        options = cls.typed_attrs.get(model, cls.typed_attrs.get(label, {}))
         return {
-            name: self._resolve_page_type_attr_values(value)
+            name: cls._resolve_page_type_attr_values(value, strict)
             for name, value in options.items()
         }
 
+    @classmethod
+    def compile_page_type_attrs(cls, page_type, strict=None):
+        """Resolve and cache the attributes applied for a page type."""
+        if strict is None:
+            strict = settings.WAGTAILNEST.TYPED_ATTRS['STRICT']
+        attrs = {}
+        for model in reversed(page_type.__mro__):
+            attrs.update(cls._resolve_page_type_attrs(model, strict))
+        attrs = MappingProxyType(attrs)
+        cls._compiled_typed_attrs[(cls, page_type)] = attrs
+        return attrs
+
+    @classmethod
+    def get_page_type_attrs(cls, page_type):
+        attrs = cls._compiled_typed_attrs.get((cls, page_type))
+        if attrs is None:
+            attrs = cls.compile_page_type_attrs(page_type)
+        return attrs
+
     def apply_page_type_attrs(self):
         page_type = self.get_page_type()
-        for model in reversed(page_type.__mro__):
-            for name, value in self._resolve_page_type_attrs(model).items():
-                setattr(self, name, value)
+        for name, value in self.get_page_type_attrs(page_type).items():
+            setattr(self, name, value)
 
     # pylint: disable=unused-argument,no-self-use
     def check_query_parameters(self, queryset):
         return  # TODO: Allow only what's on our custom filterset
 
 
-class WTNPagesAPIEndpoint(ExtraAttrsAPIEndpoint, PagesAPIEndpoint):
+class ProjectedListingMixin:
+    """Load only the columns and relations a listing's fields need.
+
+    When the client names its ``fields``, large columns outside them and
+    ``projection_keep_fields`` are deferred; the default representation
+    always loads whole rows. With ``prefetch_listing_relations`` the
+    requested relations are prefetched.
+    """
+    projection_keep_fields = []  # type: list
+    prefetch_listing_relations = True
+
+    def filter_queryset(self, queryset):
+        # Before filtering, as search returns results rather than querysets
+        if getattr(self, 'action', None) == 'listing_view':
+            queryset = self.project_queryset(queryset)
+        return super().filter_queryset(queryset)
+
+    def get_projection_keep_fields(self):
+        """Return the columns to keep, or None not to defer any."""
+        # pylint: disable=no-member
+        if 'fields' not in self.request.GET:
+            return None
+        return self.projection_keep_fields
+
+    def project_queryset(self, queryset):
+        # pylint: disable=no-member
+        field_names = self.get_serializer_class().Meta.fields
+        model = queryset.model
+        keep_fields = self.get_projection_keep_fields()
+        if keep_fields is not None:
+            queryset = queryset.defer(*get_deferred_field_names(
+                model, field_names, keep_fields))
+        if self.prefetch_listing_relations:
+            queryset = queryset.prefetch_related(
+                *get_relation_field_names(model, field_names))
+        return queryset
+
+
+def compile_typed_attrs(strict=None):
+    """Resolve typed_attrs for every registered endpoint and page model."""
+    endpoints = settings.WAGTAILNEST.API_ENDPOINTS
+    for name in sorted(endpoints):
+        endpoint = import_from_string(endpoints[name], name)
+        if not issubclass(endpoint, ExtraAttrsAPIEndpoint):
+            continue
+        for model in get_page_models():
+            endpoint.compile_page_type_attrs(model, strict)
+
+
+class WTNPagesAPIEndpoint(InstrumentedViewMixin, ExtraAttrsAPIEndpoint,
+                          ProjectedListingMixin, PagesAPIEndpoint):
     base_serializer_class = WTNPageSerializer
     known_query_parameters = PagesAPIEndpoint.known_query_parameters.union([
         'revision',
@@ -95,6 +197,10 @@ class WTNPagesAPIEndpoint(ExtraAttrsAPIEndpoint, PagesAPIEndpoint):
         'root_relative_url',
         'url_path',
     ]
+    # Read by root_relative_url, html_url and url_path lookups
+    projection_keep_fields = ['url_path']
+    # specific_pages prefetches relations once pages have their own types
+    prefetch_listing_relations = False
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -117,14 +223,21 @@ class WTNPagesAPIEndpoint(ExtraAttrsAPIEndpoint, PagesAPIEndpoint):
             qs = Page.objects.all()
             # Filter pages by specified models
             qs = filter_page_type(qs, models)
+        return self.filter_visible(qs)
+
+    def filter_visible(self, qs):
+        """Narrow a page queryset to what this request may see."""
         if self.revision_wanted is not None or self.is_preview:
             # Get pages that the current user has permission to publish
             qs = publishable_pages(self.user, qs)
+        elif settings.WAGTAILNEST.PUBLIC_PAGE_INDEX['ENABLED']:
+            # Live, public and under the site root, in one join
+            return PublicPage.filter_public(qs, self.request.site)
         else:
             # Get live pages that are not in a private section
             qs = qs.live().public()
         # Filter by site
-        return qs.descendant_of(request.site.root_page, inclusive=True)
+        return qs.descendant_of(self.request.site.root_page, inclusive=True)
 
     def get_object(self):
         if self._object is None:
@@ -152,37 +265,294 @@ class WTNPagesAPIEndpoint(ExtraAttrsAPIEndpoint, PagesAPIEndpoint):
         authenticated = self.user is not None and self.user.is_authenticated
         return authenticated and preview
 
+    @property
+    def response_cacheable(self):
+        authenticated = self.user is not None and self.user.is_authenticated
+        return not authenticated and 'revision' not in self.request.GET
+
+    def get_response_variant(self, request, instance):
+        """The request details which change a page's serialized response."""
+        last_published_at = instance.last_published_at
+        return (
+            last_published_at.isoformat() if last_published_at else None,
+            request.accepted_renderer.format,
+            request.GET.get('fields', ''),
+            request.GET.get('type', ''),
+        )
+
+    def cached_detail_view(self, request, instance, response_cache):
+        """Serve a page from the response cache, honouring conditional GET."""
+        variant = self.get_response_variant(request, instance)
+        cached = response_cache.get(instance.pk, variant)
+        if cached is None:
+            data = self.get_serializer(instance).data
+            content = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+            etag = quote_etag(sha1(content.encode('utf-8')).hexdigest())
+            response_cache.set(instance.pk, variant, (etag, data))
+        else:
+            etag, data = cached
+        response = Response(data)
+        response['ETag'] = etag
+        last_modified = None
+        if instance.last_published_at is not None:
+            last_modified = timegm(instance.last_published_at.utctimetuple())
+            response['Last-Modified'] = http_date(last_modified)
+        return get_conditional_response(
+            request, etag=etag, last_modified=last_modified, response=response)
+
+    @staticmethod
+    def get_revision_as_page(instance, revision_id):
+        """Get a revision's page object, decoding each revision only once.
+
+        as_page_object copies tree and status fields from the live page, so
+        those are part of the key alongside the immutable revision id.
+        """
+        revision_cache = get_revision_cache()
+        key = (
+            revision_id, instance.pk, instance.path, instance.url_path,
+            instance.numchild, instance.draft_title, instance.live,
+            instance.has_unpublished_changes, instance.owner_id,
+            instance.locked, instance.latest_revision_created_at,
+            instance.first_published_at)
+        page = None if revision_cache is None else revision_cache.get(key)
+        if revision_cache is not None:
+            count_lookup('revisions', page is not None)
+        if page is None:
+            revision = get_object_or_404(instance.revisions, id=revision_id)
+            page = revision.as_page_object()
+            if revision_cache is not None:
+                revision_cache.set(key, page, len(revision.content_json))
+        return page
+
     def detail_view(self, request, pk):
         """Override to provide revision rendering."""
         instance = self.get_object()
+        response_cache = (
+            get_response_cache() if self.response_cacheable else None)
+        if response_cache is not None:
+            return self.cached_detail_view(request, instance, response_cache)
         if self.revision_wanted is not None:
-            instance = get_object_or_404(
-                instance.revisions, id=self.revision_wanted).as_page_object()
+            set_action('revision')
+            instance = self.get_revision_as_page(
+                instance, self.revision_wanted)
         elif self.is_preview:
-            instance = instance.get_latest_revision_as_page()
+            set_action('preview')
+            if instance.has_unpublished_changes:
+                revision_id = instance.revisions.order_by(
+                    '-created_at', '-id').values_list(
+                        'id', flat=True).first()
+                if revision_id is not None:
+                    instance = self.get_revision_as_page(
+                        instance, revision_id)
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
+    @property
+    def route_cacheable(self):
+        """Only plain live lookups share a route; drafts and types don't."""
+        return (
+            self.revision_wanted is None and not self.is_preview and
+            'type' not in self.request.GET)
+
+    def _get_cached_page(self, route, path):
+        """Load a cached route's page, if it's still visible at ``path``.
+
+        Routes are only a hint: the specific page is fetched through the
+        same filters as ``get_queryset``. A hit saves the separate
+        ``.specific`` query but still makes this one, so lookups by URL
+        never take zero queries. Caching visibility with the route would
+        let other processes serve unpublished pages until their entries
+        expire.
+        """
+        page_id, content_type_id = route
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        if model is None:
+            return None
+        return self.filter_visible(model.objects.filter(
+            pk=page_id, url_path=path)).first()
+
     def get_page_for_url(self, request):
         path = get_urlpath(request)
+        if path is None:
+            return None
+        route_cache = get_route_cache() if self.route_cacheable else None
+        if route_cache is not None:
+            route = route_cache.get(request.site.pk, path)
+            if route is not None:
+                page = self._get_cached_page(route, path)
+                if page is not None:
+                    return page
         page = self.get_queryset().filter(url_path=path).first()
-        return page.specific if page is not None else None
+        if page is None:
+            return None
+        if route_cache is not None:
+            route_cache.set(
+                request.site.pk, path, page.pk, page.content_type_id)
+        return page.specific
 
     def listing_view(self, request):
         """Override to provide single instance by url."""
         self._object = self.get_page_for_url(request)
         if self._object is not None:
+            set_action('by_url')
             self.kwargs.update({'pk': self._object.pk})
             # pylint: disable=attribute-defined-outside-init
             self.action = 'detail_view'
             return self.detail_view(request, pk=self._object.pk)
-        return super().listing_view(request)
+        queryset = self.get_queryset()
+        self.check_query_parameters(queryset)
+        queryset = self.filter_queryset(queryset)
+        pages = self.paginate_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        pages = specific_pages(
+            pages, serializer_class.Meta.fields,
+            self.get_projection_keep_fields())
+        prefetch_embeds(pages)
+        serializer = serializer_class(
+            pages, many=True, context=self.get_serializer_context())
+        with timer('serialize'):
+            data = serializer.data
+        return self.get_paginated_response(data)
+
+
+class WTNPagesBatchAPIEndpoint(WTNPagesAPIEndpoint):
+    """Fetch many pages by id or url_path in one request.
+
+    ``?ids=``, ``?url_paths=`` and ``?root_relative_urls=`` take comma
+    separated lists. Pages are serialized as by the pages detail view and
+    keyed by the value requested, under the name of the parameter that
+    requested them; values matching no page get a 404 item.
+    """
+    known_query_parameters = WTNPagesAPIEndpoint.known_query_parameters.union([
+        'ids',
+        'url_paths',
+        'root_relative_urls',
+    ])
+    groups = ['ids', 'url_paths', 'root_relative_urls']
+    name = 'pages_batch'
+
+    @staticmethod
+    def _split(value):
+        return [item for item in value.split(',') if item]
+
+    def get_lookup(self, group, key):
+        """Return the ``(field, value)`` lookup for one requested value."""
+        if group == 'ids':
+            try:
+                return ('pk', int(key))
+            except ValueError:
+                raise BadRequestError('ids must be integers')
+        if group == 'url_paths':
+            return ('url_path', _clean_rel_url(key))
+        return ('url_path', get_url_path(key))
+
+    def get_requested(self):
+        """Map each parameter given to ``{value: (field, value)}``."""
+        params = self.request.GET
+        requested = OrderedDict()  # type: OrderedDict
+        for group in self.groups:
+            keys = self._split(params.get(group, ''))
+            if keys:
+                requested[group] = OrderedDict(
+                    (key, self.get_lookup(group, key)) for key in keys)
+        if not requested:
+            raise BadRequestError(
+                'ids, url_paths or root_relative_urls is required')
+        max_items = settings.WAGTAILNEST.PAGES_BATCH['MAX_ITEMS']
+        if sum(len(keys) for keys in requested.values()) > max_items:
+            raise BadRequestError(
+                'at most {} pages can be fetched at once'.format(max_items))
+        return requested
+
+    def get_fields_config(self):
+        if 'fields' not in self.request.GET:
+            return []
+        try:
+            return parse_fields_parameter(self.request.GET['fields'])
+        except ValueError as err:
+            raise BadRequestError('fields error: {}'.format(err))
+
+    def get_serializer_classes(self, pages):
+        """Build the detail serializer for each page type requested.
+
+        A type which can't be serialized with the requested fields maps
+        to the BadRequestError raised for it.
+        """
+        fields_config = self.get_fields_config()
+        router = self.request.wagtailapi_router
+        classes = {}
+        for page in pages:
+            if page.content_type_id in classes:
+                continue
+            model = ContentType.objects.get_for_id(
+                page.content_type_id).model_class() or Page
+            try:
+                classes[page.content_type_id] = self._get_serializer_class(
+                    router, model, fields_config, show_details=True)
+            except BadRequestError as err:
+                classes[page.content_type_id] = err
+        return classes
 
+    def listing_view(self, request):
+        """Serialize every requested page, keyed by the value requested."""
+        if self.revision_wanted is not None or self.is_preview:
+            raise BadRequestError(
+                'revision and preview are not supported in a batch')
+        requested = self.get_requested()
+        lookups = [
+            lookup for keys in requested.values() for lookup in keys.values()]
+        ids = [value for field, value in lookups if field == 'pk']
+        paths = [value for field, value in lookups if field == 'url_path']
+        pages = list(self.get_queryset().filter(
+            Q(pk__in=ids) | Q(url_path__in=paths)))
+        classes = self.get_serializer_classes(pages)
+        field_names = set()
+        for serializer_class in classes.values():
+            if not isinstance(serializer_class, BadRequestError):
+                field_names.update(serializer_class.Meta.fields)
+        pages = specific_pages(
+            pages, field_names, self.get_projection_keep_fields())
+        prefetch_embeds(pages)
+        found = {}
+        for page in pages:
+            found[('pk', page.pk)] = found[('url_path', page.url_path)] = page
+        context = self.get_serializer_context()
+        items = OrderedDict()  # type: OrderedDict
+        with timer('serialize'):
+            for group, keys in requested.items():
+                items[group] = OrderedDict()
+                for key, lookup in keys.items():
+                    items[group][key] = self.serialize_item(
+                        found.get(lookup), classes, context)
+        return Response(OrderedDict([
+            ('meta', {'total_count': len(pages)}),
+            ('items', items),
+        ]))
 
-class WTNPageRevisionsAPIEndpoint(BaseAPIEndpoint):
+    @staticmethod
+    def serialize_item(page, classes, context):
+        if page is None:
+            return {'message': 'Page not found', 'status': 404}
+        serializer_class = classes[page.content_type_id]
+        if isinstance(serializer_class, BadRequestError):
+            return {'message': str(serializer_class), 'status': 400}
+        return serializer_class(page, context=context).data
+
+    @classmethod
+    def get_urlpatterns(cls):
+        return [
+            url(r'^$', cls.as_view({'get': 'listing_view'}), name='listing'),
+        ]
+
+
+class WTNPageRevisionsAPIEndpoint(InstrumentedViewMixin, BaseAPIEndpoint):
     base_serializer_class = PageRevisionSerializer
+    pagination_class = CursorPagination
+    cursor_ordering = ['-page_id', '-created_at', '-id']
     filter_backends = [FieldsFilter, OrderingFilter, SearchFilter]
     known_query_parameters = BaseAPIEndpoint.known_query_parameters.union([
+        'cursor',
+        'latest',
         'root_relative_url',
         'url_path',
     ])
@@ -193,24 +563,39 @@ class WTNPageRevisionsAPIEndpoint(BaseAPIEndpoint):
     name = 'page_revisions'
     model = PageRevision
 
+    @property
+    def latest_only(self):
+        return self.request.GET.get('latest', 'false').lower() == 'true'
+
     def get_queryset(self):
+        """Revisions of publishable pages, newest first within each page.
+
+        Pages are matched on their tree path prefixes through a join rather
+        than a ``page__in`` subquery. ``?latest=true`` keeps one revision
+        per page by matching ``Page.latest_revision_created_at``, which the
+        page_id/created_at index resolves without scanning older history.
+        """
         user = self.request.user
         if user is None or not user.is_authenticated:
             return PageRevision.objects.none()  # pylint: disable=no-member
-        page_ids = publishable_pages(user).values_list('pk', flat=True)
-        qs = PageRevision.objects.filter(  # pylint: disable=no-member
-            page__in=page_ids).order_by('-page', '-created_at')
+        # pylint: disable=no-member
+        qs = PageRevision.objects.select_related('user', 'page')
+        qs = publishable_pages(user, qs, path_field='page__path')
         url_path = get_urlpath(self.request)
         if url_path is not None:
             qs = qs.filter(page__url_path=url_path)
-        return qs
+        if self.latest_only:
+            qs = qs.filter(created_at=F('page__latest_revision_created_at'))
+        return qs.order_by('-page', '-created_at', '-id')
 
 
-class WTNImagesAPIEndpoint(ImagesAPIEndpoint):
+class WTNImagesAPIEndpoint(InstrumentedViewMixin, ProjectedListingMixin,
+                           ImagesAPIEndpoint):
     base_serializer_class = WTNImageSerializer
 
 
-class WTNDocumentsAPIEndpoint(DocumentsAPIEndpoint):
+class WTNDocumentsAPIEndpoint(InstrumentedViewMixin, ProjectedListingMixin,
+                              DocumentsAPIEndpoint):
     base_serializer_class = WTNDocumentSerializer
     meta_fields = BaseAPIEndpoint.meta_fields + [
         'tags', 'download_url', 'filename'
@@ -220,9 +605,14 @@ class WTNDocumentsAPIEndpoint(DocumentsAPIEndpoint):
     ]
 
 
-class WTNRedirectsAPIEndpoint(BaseAPIEndpoint):
+class WTNRedirectsAPIEndpoint(InstrumentedViewMixin, BaseAPIEndpoint):
     base_serializer_class = RedirectSerializer
+    pagination_class = CursorPagination
+    cursor_ordering = ['id']
     filter_backends = [FieldsFilter, OrderingFilter, SearchFilter]
+    known_query_parameters = BaseAPIEndpoint.known_query_parameters.union([
+        'cursor',
+    ])
     body_fields = BaseAPIEndpoint.body_fields + [
         'site', 'old_path', 'is_permanent', 'redirect_page', 'redirect_link'
     ]
@@ -231,3 +621,43 @@ class WTNRedirectsAPIEndpoint(BaseAPIEndpoint):
     nested_default_fields = body_fields
     name = 'redirects'
     model = Redirect
+    bulk_permissions = [
+        'wagtailredirects.add_redirect', 'wagtailredirects.change_redirect']
+
+    def get_bulk_format(self):
+        fmt = self.request.GET.get('file_format')
+        if fmt is None:
+            content_type = self.request.content_type.split(';')[0].strip()
+            fmt = next((
+                name for name, mimetype in FORMATS.items()
+                if mimetype == content_type), 'csv')
+        if fmt not in FORMATS:
+            raise BadRequestError("file_format must be one of: {}".format(
+                ', '.join(sorted(FORMATS))))
+        return fmt
+
+    def bulk_export(self, request):
+        """Stream every redirect as CSV or NDJSON (``?file_format=``)."""
+        fmt = self.get_bulk_format()
+        response = StreamingHttpResponse(
+            export_rows(fmt), content_type=FORMATS[fmt])
+        response['Content-Disposition'] = (
+            'attachment; filename=redirects.{}'.format(fmt))
+        return response
+
+    def bulk_import(self, request):
+        """Create or update redirects from a CSV or NDJSON request body."""
+        if not request.user.has_perms(self.bulk_permissions):
+            raise PermissionDenied()
+        fmt = self.get_bulk_format()
+        stream = request.stream
+        lines = (line.decode('utf-8') for line in stream or [])
+        # Undecodable input ends the import with an error row in the report
+        return Response(import_rows(lines, fmt))
+
+    @classmethod
+    def get_urlpatterns(cls):
+        return super().get_urlpatterns() + [
+            url(r'^bulk/$', cls.as_view({
+                'get': 'bulk_export', 'post': 'bulk_import'}), name='bulk'),
+        ]
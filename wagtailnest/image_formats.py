@@ -2,26 +2,41 @@ from django.utils.html import escape
 from wagtail.images.formats import Format as BaseFormat
 from wagtail.images.shortcuts import get_rendition_or_not_found
 
+from wagtailnest.cache import get_rendition_cache
 from wagtailnest.utils import generate_image_url
 
 
 class Format(BaseFormat):
     """Extension to Format which gives an absolute URI."""
 
+    def get_rendition_data(self, image):
+        """Get the rendition's absolute URL, width and height, cached."""
+        rendition_cache = get_rendition_cache()
+        if rendition_cache is not None:
+            data = rendition_cache.get(image, self.filter_spec)
+            if data is not None:
+                return data
+        rendition = get_rendition_or_not_found(image, self.filter_spec)
+        url = generate_image_url(image, self.filter_spec)
+        # Don't remember the placeholder for a missing source file
+        if rendition_cache is not None and rendition.pk is not None:
+            rendition_cache.set(
+                image, self.filter_spec, url, rendition.width,
+                rendition.height)
+        return (url, rendition.width, rendition.height)
+
     # Override to get the CMS API URL instead of a relative one
     def image_to_html(self, image, alt_text, extra_attributes=''):
-        rendition = get_rendition_or_not_found(image, self.filter_spec)
+        url, width, height = self.get_rendition_data(image)
 
         if self.classnames:
             class_attr = 'class="%s" ' % escape(self.classnames)
         else:
             class_attr = ''
 
-        url = generate_image_url(image, self.filter_spec)
-
         return '<img %s%ssrc="%s" width="%d" height="%d" alt="%s">' % (
             extra_attributes, class_attr,
-            escape(url), rendition.width, rendition.height, alt_text
+            escape(url), width, height, alt_text
         )
 
     @classmethod
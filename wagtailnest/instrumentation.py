@@ -0,0 +1,302 @@
+"""Per-request timings, query counts and cache counters for the views.
+
+Views using ``InstrumentedViewMixin`` are measured per endpoint and
+action while ``INSTRUMENTATION['ENABLED']`` is set, and each measurement
+is handed to the configured sinks. When disabled, ``count`` and ``timer``
+reduce to a thread-local lookup.
+"""
+import logging
+import socket
+from collections import OrderedDict, defaultdict
+from contextlib import ExitStack, contextmanager
+from threading import Lock, local
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+from rest_framework.settings import import_from_string
+
+logger = logging.getLogger(__name__)
+_state = local()
+
+
+class Metrics:
+    """What one request to one endpoint action cost, in milliseconds."""
+
+    def __init__(self, endpoint, action=None):
+        self.endpoint = endpoint
+        self.action = action
+        self.timings = OrderedDict([('total', 0.0)])  # type: OrderedDict
+        self.queries = 0
+        self.counters = defaultdict(int)  # type: dict
+        self.started = perf_counter()
+
+    def add_time(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds * 1000
+
+    def __call__(self, execute, sql, params, many, context):
+        """Count and time queries, as a connection's execute_wrapper."""
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.add_time('sql', perf_counter() - started)
+
+    def finish(self):
+        self.timings['total'] = (perf_counter() - self.started) * 1000
+
+    def server_timing(self):
+        """Format the timings as a Server-Timing header value."""
+        parts = []
+        for name, duration in self.timings.items():
+            part = '{};dur={:.1f}'.format(name, duration)
+            if name == 'sql':
+                part += ';desc="{} queries"'.format(self.queries)
+            parts.append(part)
+        return ', '.join(parts)
+
+
+def current():
+    """Return the Metrics being recorded in this thread, if any."""
+    return getattr(_state, 'metrics', None)
+
+
+def count(name, amount=1):
+    metrics = getattr(_state, 'metrics', None)
+    if metrics is not None:
+        metrics.counters[name] += amount
+
+
+def count_lookup(cache_name, hit):
+    metrics = getattr(_state, 'metrics', None)
+    if metrics is not None:
+        metrics.counters[
+            '{}.{}'.format(cache_name, 'hit' if hit else 'miss')] += 1
+
+
+def set_action(action):
+    """Name the current request's action more precisely than the view."""
+    metrics = getattr(_state, 'metrics', None)
+    if metrics is not None:
+        metrics.action = action
+
+
+@contextmanager
+def timer(name):
+    metrics = getattr(_state, 'metrics', None)
+    if metrics is None:
+        yield
+        return
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_time(name, perf_counter() - started)
+
+
+def is_enabled():
+    return settings.WAGTAILNEST.INSTRUMENTATION['ENABLED']
+
+
+@contextmanager
+def instrument(endpoint, action=None):
+    """Measure the enclosed block and emit it to the sinks when done."""
+    metrics = Metrics(endpoint, action)
+    previous = current()
+    _state.metrics = metrics
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                # execute_wrapper arrived in Django 2.0
+                if hasattr(connection, 'execute_wrapper'):
+                    stack.enter_context(connection.execute_wrapper(metrics))
+            yield metrics
+    finally:
+        _state.metrics = previous
+        metrics.finish()
+        emit(metrics)
+
+
+class TimedSerializer:
+    """Proxy a serializer, timing the evaluation of its ``data``."""
+
+    def __init__(self, serializer):
+        self._serializer = serializer
+
+    def __getattr__(self, name):
+        return getattr(self._serializer, name)
+
+    @property
+    def data(self):
+        with timer('serialize'):
+            return self._serializer.data
+
+
+class InstrumentedViewMixin:
+    """Measure ``dispatch`` under ``metrics_name`` and the view's action.
+
+    The action defaults to the viewset action without its ``_view``
+    suffix, or the HTTP method; views can refine it with ``set_action``.
+    """
+
+    metrics_name = None
+
+    def get_metrics_name(self):
+        return (
+            self.metrics_name or getattr(self, 'name', None) or
+            self.__class__.__name__)
+
+    def get_metrics_action(self, request):
+        action = getattr(self, 'action', None) or request.method.lower()
+        if action.endswith('_view'):
+            action = action[:-len('_view')]
+        return action
+
+    def dispatch(self, request, *args, **kwargs):
+        if not is_enabled():
+            return super().dispatch(request, *args, **kwargs)
+        with instrument(self.get_metrics_name()) as metrics:
+            try:
+                response = super().dispatch(request, *args, **kwargs)
+            finally:
+                if metrics.action is None:
+                    metrics.action = self.get_metrics_action(request)
+        if settings.WAGTAILNEST.INSTRUMENTATION['SERVER_TIMING']:
+            response['Server-Timing'] = metrics.server_timing()
+        return response
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if current() is None:
+            return serializer
+        return TimedSerializer(serializer)
+
+
+class LoggingSink:
+    """Log one line per measured request at INFO."""
+
+    def emit(self, metrics):  # pylint: disable=no-self-use
+        logger.info(
+            '%s %s %s queries=%d %s', metrics.endpoint, metrics.action,
+            ' '.join(
+                '{}={:.1f}ms'.format(name, duration)
+                for name, duration in metrics.timings.items()),
+            metrics.queries,
+            ' '.join(
+                '{}={}'.format(name, value)
+                for name, value in sorted(metrics.counters.items())))
+
+
+class StatsdSink:
+    """Send timers and counters to a statsd daemon over UDP."""
+
+    def __init__(self):
+        conf = settings.WAGTAILNEST.INSTRUMENTATION
+        self.address = (conf['STATSD_HOST'], conf['STATSD_PORT'])
+        self.prefix = conf['STATSD_PREFIX']
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def emit(self, metrics):
+        prefix = '{}.{}.{}'.format(
+            self.prefix, metrics.endpoint, metrics.action)
+        lines = ['{}.requests:1|c'.format(prefix)]
+        lines += [
+            '{}.{}:{:.3f}|ms'.format(prefix, name, duration)
+            for name, duration in metrics.timings.items()]
+        lines.append('{}.queries:{}|c'.format(prefix, metrics.queries))
+        lines += [
+            '{}.{}:{}|c'.format(prefix, name, value)
+            for name, value in metrics.counters.items()]
+        self.socket.sendto('\n'.join(lines).encode('utf-8'), self.address)
+
+
+class PrometheusSink:
+    """Keep running totals for ``prometheus_view`` to expose.
+
+    Totals are per process, so each worker has to be scraped separately.
+    """
+
+    def __init__(self):
+        self.requests = defaultdict(int)  # type: dict
+        self.queries = defaultdict(int)  # type: dict
+        self.durations = defaultdict(float)  # type: dict
+        self.counters = defaultdict(int)  # type: dict
+        self._lock = Lock()
+
+    def emit(self, metrics):
+        labels = (metrics.endpoint, metrics.action)
+        with self._lock:
+            self.requests[labels] += 1
+            self.queries[labels] += metrics.queries
+            for name, duration in metrics.timings.items():
+                self.durations[labels + (name,)] += duration / 1000
+            for name, value in metrics.counters.items():
+                self.counters[labels + (name,)] += value
+
+    @staticmethod
+    def _labels(names, values):
+        return ','.join(
+            '{}="{}"'.format(name, str(value).replace('"', '\\"'))
+            for name, value in zip(names, values))
+
+    def render(self):
+        """Render the totals in the Prometheus text exposition format."""
+        series = [
+            ('wagtailnest_requests_total', 'counter',
+             ('endpoint', 'action'), self.requests),
+            ('wagtailnest_queries_total', 'counter',
+             ('endpoint', 'action'), self.queries),
+            ('wagtailnest_duration_seconds_total', 'counter',
+             ('endpoint', 'action', 'timer'), self.durations),
+            ('wagtailnest_cache_lookups_total', 'counter',
+             ('endpoint', 'action', 'lookup'), self.counters),
+        ]
+        lines = []
+        with self._lock:
+            for metric, kind, names, values in series:
+                lines.append('# TYPE {} {}'.format(metric, kind))
+                for labels, value in sorted(values.items()):
+                    lines.append('{}{{{}}} {}'.format(
+                        metric, self._labels(names, labels), value))
+        return '\n'.join(lines) + '\n'
+
+
+_sinks = None
+
+
+def get_sinks():
+    """Return the configured sinks, created once per process."""
+    global _sinks  # pylint: disable=global-statement
+    if _sinks is None:
+        _sinks = [
+            import_from_string(path, 'SINKS')()
+            for path in settings.WAGTAILNEST.INSTRUMENTATION['SINKS']]
+    return _sinks
+
+
+def emit(metrics):
+    for sink in get_sinks():
+        try:
+            sink.emit(metrics)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception('Could not emit metrics to %r', sink)
+
+
+def prometheus_view(request):
+    """Expose the PrometheusSink's totals to the scrapers in METRICS_IPS.
+
+    No address is allowed by default. List the scraper's addresses as
+    REMOTE_ADDR shows them. Behind a reverse proxy REMOTE_ADDR is the
+    proxy's, so restrict ``metrics/`` at the proxy instead of listing it.
+    """
+    conf = settings.WAGTAILNEST.INSTRUMENTATION
+    if request.META.get('REMOTE_ADDR') not in conf['METRICS_IPS']:
+        raise Http404
+    for sink in get_sinks():
+        if isinstance(sink, PrometheusSink):
+            return HttpResponse(
+                sink.render(),
+                content_type='text/plain; version=0.0.4; charset=utf-8')
+    raise Http404
@@ -0,0 +1,230 @@
+"""Benchmark the API and serve views against a synthetic site."""
+import random
+import sys
+
+import django
+import wagtail
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+from wagtail.core.models import Page, Site
+from wagtail.images.formats import get_image_formats
+
+from wagtailnest import benchmark
+from wagtailnest.cache import (get_permission_cache, get_rendition_cache,
+                               get_route_cache)
+from wagtailnest.models import PublicPage
+from wagtailnest.redirects import get_redirect_index
+
+SCENARIOS = [
+    'pages_by_url', 'pages_listing', 'pages_preview', 'revisions',
+    'image_serve', 'document_serve',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a synthetic page tree with revisions, redirects, images '
+        'and documents under the default site, then time requests to the '
+        'API and serve views through the full middleware stack. Reports '
+        'latency percentiles, queries per request and, optionally, peak '
+        'memory. All generated data is rolled back and its files deleted. '
+        "The default site's hostname must be in ALLOWED_HOSTS.")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.images = []  # type: list
+        self.documents = []  # type: list
+
+    def add_arguments(self, parser):
+        group = parser.add_argument_group('fixtures')
+        group.add_argument('--pages', type=int, default=1000)
+        group.add_argument('--fanout', type=int, default=10)
+        group.add_argument(
+            '--depth', type=int,
+            help='Deepest level to generate, below the site root.')
+        group.add_argument(
+            '--restrict-every', type=int, default=10,
+            help='Login-restrict every Nth top-level section; 0 for none.')
+        group.add_argument(
+            '--page-type', action='append', default=[],
+            help='app_label.Model to mix in through add_child.')
+        group.add_argument(
+            '--typed-pages', type=int, default=0,
+            help='How many pages of the --page-type models to add.')
+        group.add_argument(
+            '--revision-pages', type=int, default=200,
+            help='How many pages get revisions.')
+        group.add_argument('--revisions', type=int, default=3)
+        group.add_argument('--redirects', type=int, default=1000)
+        group.add_argument('--images', type=int, default=10)
+        group.add_argument('--image-size', type=int, default=800)
+        group.add_argument('--documents', type=int, default=5)
+        group.add_argument('--document-size', type=int, default=1024 * 1024)
+        group = parser.add_argument_group('run')
+        group.add_argument(
+            '--scenario', action='append', choices=SCENARIOS, default=[],
+            help='Run only these scenarios.')
+        group.add_argument('--iterations', type=int, default=200)
+        group.add_argument('--warmup', type=int, default=20)
+        group.add_argument(
+            '--memory', type=int, default=0,
+            help='Extra requests per scenario to trace peak memory for.')
+        group.add_argument('--seed', type=int, default=1)
+        group = parser.add_argument_group('baseline')
+        group.add_argument('--save', help='Write the results to this file.')
+        group.add_argument(
+            '--compare', help='Compare with results saved by --save.')
+        group.add_argument(
+            '--threshold', type=float, default=0.1,
+            help='Allowed slowdown, as a fraction, before flagging.')
+        group.add_argument(
+            '--fail-on-regression', action='store_true',
+            help='Exit with an error if anything regressed.')
+
+    @staticmethod
+    def get_page_models(options):
+        try:
+            return [apps.get_model(name) for name in options['page_type']]
+        except (LookupError, ValueError) as err:
+            raise CommandError(str(err))
+
+    def generate(self, site, options):
+        """Create the fixtures; returns what the scenarios request."""
+        rng = random.Random(options['seed'])
+        pages = benchmark.generate_page_tree(
+            site.root_page, options['pages'], options['fanout'],
+            options['restrict_every'], options['depth'])
+        page_ids = list(pages.values_list('pk', flat=True))
+        if not page_ids:
+            raise CommandError('No pages were generated')
+        models = self.get_page_models(options)
+        if models and options['typed_pages']:
+            benchmark.generate_typed_pages(
+                page_ids, models, options['typed_pages'])
+        if settings.WAGTAILNEST.PUBLIC_PAGE_INDEX['ENABLED']:
+            PublicPage.rebuild()
+        public = list(Page.objects.live().public().descendant_of(
+            site.root_page).values_list('url_path', flat=True))
+        sample = rng.sample(public, min(len(public), 200))
+        revised = Page.objects.filter(pk__in=rng.sample(
+            page_ids, min(len(page_ids), options['revision_pages'])))
+        benchmark.generate_revisions(revised, options['revisions'])
+        benchmark.generate_redirects(
+            site, Page.objects.filter(pk__in=page_ids[:1000]),
+            options['redirects'])
+        get_redirect_index().invalidate()
+        self.images = benchmark.generate_images(
+            options['images'], options['image_size'])
+        self.documents = benchmark.generate_documents(
+            options['documents'], options['document_size'])
+        return {
+            'url_paths': sample,
+            'revised_paths': list(revised.values_list('url_path', flat=True)),
+        }
+
+    def get_urls(self, fixtures):
+        pages = reverse('wagtailapi:pages:listing')
+        revisions = reverse('wagtailapi:page_revisions:listing')
+        formats = [
+            image_format.name for image_format in get_image_formats()]
+        return {
+            'pages_by_url': [
+                '{}?url_path={}'.format(pages, path)
+                for path in fixtures['url_paths']],
+            'pages_listing': [
+                '{}?limit=20&offset={}'.format(pages, offset)
+                for offset in range(0, 200, 20)],
+            'pages_preview': [
+                '{}?url_path={}&preview=true'.format(pages, path)
+                for path in fixtures['revised_paths']],
+            'revisions': [
+                revisions + '?cursor=', revisions + '?latest=true'] + [
+                '{}?url_path={}'.format(revisions, path)
+                for path in fixtures['revised_paths'][:20]],
+            'image_serve': [
+                '{}?filter_spec={}'.format(reverse(
+                    'wagtailimages_serve_easy', kwargs={'pk': image.pk}),
+                    image_format)
+                for image in self.images
+                for image_format in formats or ['original']],
+            'document_serve': [
+                reverse('wagtaildocs_serve', args=(
+                    document.pk, document.filename))
+                for document in self.documents],
+        }
+
+    def run(self, site, urls, options):
+        anonymous = Client(HTTP_HOST=site.hostname)
+        staff = Client(HTTP_HOST=site.hostname)
+        staff.force_login(benchmark.create_benchmark_user())
+        clients = {'pages_preview': staff, 'revisions': staff}
+        results = {}
+        for name in options['scenario'] or SCENARIOS:
+            if not urls[name]:
+                self.stderr.write('Skipping {}: nothing to request'.format(
+                    name))
+                continue
+            results[name] = benchmark.run_scenario(
+                clients.get(name, anonymous), urls[name],
+                options['iterations'], options['warmup'], options['memory'])
+            self.report(name, results[name])
+        return results
+
+    def report(self, name, result):
+        line = (
+            '{:<15} p50 {p50:8.2f}ms  p90 {p90:8.2f}ms  p99 {p99:8.2f}ms  '
+            'queries {queries:5.1f}').format(name, **result)
+        if result['peak_kb'] is not None:
+            line += '  peak {:8.0f}KiB'.format(result['peak_kb'])
+        if result['errors']:
+            line += '  errors {}'.format(result['errors'])
+        self.stdout.write(line)
+
+    def compare(self, results, options):
+        baseline = benchmark.load_results(options['compare'])
+        regressions = 0
+        rows = benchmark.compare_results(
+            baseline, results, options['threshold'])
+        for scenario, metric, old, new, regressed in rows:
+            change = (new - old) / old * 100 if old else 0.0
+            self.stdout.write(
+                '{:<15} {:<8} {:10.2f} -> {:10.2f} {:+7.1f}%{}'.format(
+                    scenario, metric, old, new, change,
+                    '  REGRESSED' if regressed else ''))
+            regressions += regressed
+        return regressions
+
+    def handle(self, *args, **options):
+        site = Site.objects.filter(is_default_site=True).first()
+        if site is None:
+            raise CommandError('No default site')
+        try:
+            with transaction.atomic():
+                try:
+                    fixtures = self.generate(site, options)
+                    results = self.run(
+                        site, self.get_urls(fixtures), options)
+                finally:
+                    benchmark.delete_files(self.images, self.documents)
+                    transaction.set_rollback(True)
+        finally:
+            # Rolled back rows may still be cached by this process
+            for cache in [get_route_cache(), get_permission_cache(),
+                          get_rendition_cache()]:
+                if cache is not None:
+                    cache.clear()
+            get_redirect_index().invalidate()
+        if options['save']:
+            benchmark.save_results(options['save'], results, {
+                'argv': sys.argv[1:],
+                'django': django.get_version(),
+                'wagtail': wagtail.__version__,
+            })
+        if options['compare']:
+            regressions = self.compare(results, options)
+            if regressions and options['fail_on_regression']:
+                raise CommandError('{} metrics regressed'.format(regressions))
@@ -0,0 +1,77 @@
+"""Compare live().public() filtering with the PublicPage index."""
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from wagtail.core.models import Page, Site
+
+from wagtailnest.benchmark import generate_page_tree, percentile, time_call
+from wagtailnest.models import PublicPage
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the public pages queryset of the default site with '
+        'live().public().descendant_of() against the PublicPage index. '
+        'With --pages, a synthetic tree is generated first; everything '
+        'is rolled back afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', type=int, default=0,
+            help='Synthetic live pages to add under the site root.')
+        parser.add_argument(
+            '--fanout', type=int, default=20,
+            help='Children per synthetic page.')
+        parser.add_argument(
+            '--restrict-every', type=int, default=10,
+            help='Add a login restriction to every Nth top-level section.')
+        parser.add_argument(
+            '--iterations', type=int, default=20,
+            help='Timed runs of each query.')
+        parser.add_argument(
+            '--limit', type=int, default=20,
+            help='Page size of the timed listing query.')
+
+    def timed(self, message, func):
+        started = perf_counter()
+        result = func()
+        self.stdout.write('{} in {:.0f}ms'.format(
+            message, (perf_counter() - started) * 1000))
+        return result
+
+    def report(self, name, get_queryset, options):
+        """Time ``get_queryset`` too, as public() queries restrictions."""
+        limit = options['limit']
+        results = [
+            ('count', time_call(
+                lambda: get_queryset().count(), options['iterations'])),
+            ('first {}'.format(limit), time_call(
+                lambda: list(get_queryset().order_by('path').values_list(
+                    'pk', flat=True)[:limit]),
+                options['iterations'])),
+        ]
+        for label, timings in results:
+            self.stdout.write(
+                '{:<10} {:<10} p50 {:8.2f}ms  p95 {:8.2f}ms'.format(
+                    name, label, percentile(timings, 0.5),
+                    percentile(timings, 0.95)))
+
+    def handle(self, *args, **options):
+        site = Site.objects.filter(is_default_site=True).first()
+        if site is None:
+            raise CommandError('No default site')
+        with transaction.atomic():
+            if options['pages']:
+                self.timed('Generated {} pages'.format(options['pages']),
+                           lambda: generate_page_tree(
+                               site.root_page, options['pages'],
+                               options['fanout'], options['restrict_every']))
+            count = self.timed(
+                'Rebuilt PublicPage index', PublicPage.rebuild)
+            self.stdout.write('{} public pages indexed'.format(count))
+            self.report('public()', lambda: Page.objects.live().public(
+                ).descendant_of(site.root_page, inclusive=True), options)
+            self.report('indexed', lambda: PublicPage.filter_public(
+                Page.objects.all(), site), options)
+            transaction.set_rollback(True)
@@ -0,0 +1,65 @@
+"""Import or export redirects as CSV or NDJSON."""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from wagtailnest.redirect_io import FORMATS, export_rows, import_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Import or export redirects as CSV or NDJSON. Imports are validated '
+        'row by row and upserted in chunks on site and old_path; invalid '
+        'rows are reported and skipped.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['import', 'export'])
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='File to read or write; "-" for stdin/stdout.')
+        parser.add_argument(
+            '--format', dest='file_format', choices=sorted(FORMATS),
+            help='Defaults to the file extension, or csv.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Rows validated and written per transaction.')
+
+    @staticmethod
+    def get_format(options):
+        if options['file_format']:
+            return options['file_format']
+        extension = options['path'].rsplit('.', 1)[-1].lower()
+        return extension if extension in FORMATS else 'csv'
+
+    @staticmethod
+    def export(path, fmt):
+        if path == '-':
+            sys.stdout.writelines(export_rows(fmt))
+            return
+        with open(path, 'w', encoding='utf-8', newline='') as handle:
+            handle.writelines(export_rows(fmt))
+
+    @staticmethod
+    def run_import(path, fmt, chunk_size):
+        if path == '-':
+            return import_rows(sys.stdin, fmt, chunk_size)
+        with open(path, encoding='utf-8', newline='') as handle:
+            return import_rows(handle, fmt, chunk_size)
+
+    def handle(self, *args, **options):
+        fmt = self.get_format(options)
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+        try:
+            if options['action'] == 'export':
+                self.export(options['path'], fmt)
+                return
+            report = self.run_import(
+                options['path'], fmt, options['chunk_size'])
+        except (OSError, UnicodeDecodeError) as err:
+            raise CommandError(str(err))
+        for error in report['errors']:
+            self.stderr.write('Line {}: {}'.format(
+                error['line'], '; '.join(error['messages'])))
+        self.stdout.write('{} created, {} updated, {} failed'.format(
+            report['created'], report['updated'], len(report['errors'])))
@@ -0,0 +1,50 @@
+"""Write the published pages API to a directory of static JSON files."""
+from time import monotonic
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from wagtail.core.models import Page, Site
+
+from wagtailnest.snapshot import Snapshot, brotli
+
+
+class Command(BaseCommand):
+    help = (
+        'Render the detail response of every live, public page of the '
+        'default site, plus listing.json and the urls.json index, to '
+        'precompressed JSON files for a web server to serve directly. '
+        'With --page, only those pages (and the indexes) are rewritten.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'directory', nargs='?',
+            help='Where to write; defaults to SNAPSHOT["DIRECTORY"].')
+        parser.add_argument(
+            '--page', type=int, action='append', default=[],
+            help='Rewrite just this page id; may be repeated.')
+        parser.add_argument(
+            '--compress', action='append', choices=['gzip', 'br'],
+            help='Compressed copies to write; defaults to '
+            'SNAPSHOT["COMPRESS"].')
+
+    def handle(self, *args, **options):
+        conf = settings.WAGTAILNEST.SNAPSHOT
+        directory = options['directory'] or conf['DIRECTORY']
+        if not directory:
+            raise CommandError('No directory given or configured')
+        compress = options['compress'] or conf['COMPRESS']
+        try:
+            snapshot = Snapshot(directory, compress=compress)
+        except Site.DoesNotExist:
+            raise CommandError('No default site is configured')
+        if 'br' in compress and brotli is None:
+            self.stderr.write('brotli is not installed; skipping .br files')
+        started = monotonic()
+        if options['page']:
+            count = snapshot.update(
+                Page.objects.filter(pk__in=options['page']))
+        else:
+            count = snapshot.export_all()
+        self.stdout.write(
+            '{} pages checked, {} files written in {:.1f}s'.format(
+                count, snapshot.written, monotonic() - started))
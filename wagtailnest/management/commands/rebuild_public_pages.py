@@ -0,0 +1,19 @@
+"""Rebuild the per-site index of live, public pages."""
+from time import monotonic
+
+from django.core.management.base import BaseCommand
+
+from wagtailnest.models import PublicPage
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the PublicPage index used when PUBLIC_PAGE_INDEX is '
+        'enabled. Run it after enabling the index or loading fixtures, '
+        'which skip the signal handlers that keep it up to date.')
+
+    def handle(self, *args, **options):
+        started = monotonic()
+        count = PublicPage.rebuild()
+        self.stdout.write('{} public pages indexed in {:.1f}s'.format(
+            count, monotonic() - started))
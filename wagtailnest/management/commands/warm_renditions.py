@@ -0,0 +1,152 @@
+"""Generate missing renditions for every registered image format."""
+from multiprocessing import Pool, cpu_count
+from time import monotonic
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils.dateparse import parse_date, parse_datetime
+from wagtail.images import get_image_model
+from wagtail.images.exceptions import InvalidFilterSpecError
+from wagtail.images.formats import get_image_formats
+from wagtail.images.models import Filter
+
+
+def _close_connections():
+    connections.close_all()
+
+
+def warm_rendition(task):
+    """Generate one rendition; returns ``(image_id, filter_spec, error)``."""
+    image_id, filter_spec = task
+    try:
+        image = get_image_model().objects.get(pk=image_id)
+        image.get_rendition(filter_spec)
+    except Exception as err:  # pylint: disable=broad-except
+        return (image_id, filter_spec, str(err) or err.__class__.__name__)
+    return (image_id, filter_spec, None)
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate missing renditions for the registered image formats. '
+        'Existing renditions are skipped, so an interrupted run resumes '
+        'where it left off when run again.')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.last_checked_id = None
+        self.images_checked = 0
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--collection', action='append', default=[],
+            help='Only images in this collection (id or name).')
+        parser.add_argument(
+            '--tag', action='append', default=[],
+            help='Only images with this tag.')
+        parser.add_argument(
+            '--since',
+            help='Only images created on or after this date/datetime.')
+        parser.add_argument(
+            '--start-id', type=int, default=0,
+            help='Skip images with a lower id.')
+        parser.add_argument(
+            '--filter-spec', action='append', default=[],
+            help='Filter spec to generate instead of the registered formats.')
+        parser.add_argument(
+            '--processes', type=int, default=cpu_count(),
+            help='Worker processes; 1 generates in this process.')
+        parser.add_argument(
+            '--progress-every', type=int, default=100,
+            help='Report progress after this many renditions.')
+
+    @staticmethod
+    def get_filter_specs(options):
+        specs = options['filter_spec'] or [
+            image_format.filter_spec for image_format in get_image_formats()]
+        filters = []
+        for spec in sorted(set(specs)):
+            image_filter = Filter(spec=spec)
+            try:
+                image_filter.operations  # pylint: disable=pointless-statement
+            except (InvalidFilterSpecError, ValueError) as err:
+                raise CommandError('Invalid filter spec {}: {}'.format(
+                    spec, err))
+            filters.append(image_filter)
+        return filters
+
+    @staticmethod
+    def get_images(options):
+        images = get_image_model().objects.filter(
+            pk__gte=options['start_id']).order_by('pk')
+        for collection in options['collection']:
+            if collection.isdigit():
+                images = images.filter(collection_id=int(collection))
+            else:
+                images = images.filter(collection__name=collection)
+        for tag in options['tag']:
+            images = images.filter(tags__name=tag)
+        if options['since']:
+            since = parse_datetime(options['since']) or parse_date(
+                options['since'])
+            if since is None:
+                raise CommandError('Invalid date: {}'.format(options['since']))
+            images = images.filter(created_at__gte=since)
+        return images.distinct()
+
+    def get_missing(self, images, filters):
+        """Yield ``(image_id, filter_spec)`` for renditions not yet made."""
+        Rendition = get_image_model().get_rendition_model()
+        checked = 0
+        for image in images.iterator():
+            existing = set(Rendition.objects.filter(image_id=image.pk)
+                           .values_list('filter_spec', 'focal_point_key'))
+            for image_filter in filters:
+                key = (image_filter.spec, image_filter.get_cache_key(image))
+                if key not in existing:
+                    yield (image.pk, image_filter.spec)
+            checked += 1
+            self.last_checked_id = image.pk
+        self.images_checked = checked
+
+    def report(self, done, errors, started):
+        elapsed = monotonic() - started
+        rate = done / elapsed if elapsed else 0
+        self.stdout.write(
+            '{} renditions generated, {} failed, {:.1f}s, {:.1f}/s'.format(
+                done - errors, errors, elapsed, rate))
+
+    def handle(self, *args, **options):
+        if options['progress_every'] < 1:
+            raise CommandError('--progress-every must be at least 1')
+        filters = self.get_filter_specs(options)
+        if not filters:
+            raise CommandError('No image formats are registered')
+        tasks = self.get_missing(self.get_images(options), filters)
+        done = errors = 0
+        started = monotonic()
+        pool = None
+        if options['processes'] > 1:
+            # Forked workers must not share the parent's connections
+            _close_connections()
+            pool = Pool(options['processes'], _close_connections)
+            results = pool.imap_unordered(warm_rendition, tasks)
+        else:
+            results = map(warm_rendition, tasks)
+        try:
+            for image_id, filter_spec, error in results:
+                done += 1
+                if error is not None:
+                    errors += 1
+                    self.stderr.write('Image {} {}: {}'.format(
+                        image_id, filter_spec, error))
+                if done % options['progress_every'] == 0:
+                    self.report(done, errors, started)
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+        self.report(done, errors, started)
+        self.stdout.write(
+            '{} images checked against {} filter specs, up to id {}'.format(
+                self.images_checked, len(filters), self.last_checked_id))
@@ -0,0 +1,38 @@
+from django.db import migrations
+
+INDEX = 'wagtailnest_pagerevision_cursor'
+TABLE = 'wagtailcore_pagerevision'
+
+
+def create_index(apps, schema_editor):  # pylint: disable=unused-argument
+    quote = schema_editor.quote_name
+    # Only PostgreSQL and SQLite know IF NOT EXISTS
+    if schema_editor.connection.vendor in ('postgresql', 'sqlite'):
+        sql = 'CREATE INDEX IF NOT EXISTS {} ON {} (page_id, created_at, id)'
+    else:
+        sql = 'CREATE INDEX {} ON {} (page_id, created_at, id)'
+    schema_editor.execute(sql.format(quote(INDEX), quote(TABLE)))
+
+
+def drop_index(apps, schema_editor):  # pylint: disable=unused-argument
+    quote = schema_editor.quote_name
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        sql = 'DROP INDEX {} ON {}'.format(quote(INDEX), quote(TABLE))
+    elif vendor in ('postgresql', 'sqlite'):
+        sql = 'DROP INDEX IF EXISTS {}'.format(quote(INDEX))
+    else:
+        sql = 'DROP INDEX {}'.format(quote(INDEX))
+    schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+    """Back page_revisions cursor pagination, ordered by page/created_at/id."""
+
+    dependencies = [
+        ('wagtailcore', '0040_page_draft_title'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
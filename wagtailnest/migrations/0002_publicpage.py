@@ -0,0 +1,34 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    """Per-site index of live, public pages; fill with rebuild_public_pages."""
+
+    dependencies = [
+        ('wagtailcore', '0040_page_draft_title'),
+        ('wagtailnest', '0001_pagerevision_cursor_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PublicPage',
+            fields=[
+                ('id', models.AutoField(
+                    auto_created=True, primary_key=True, serialize=False,
+                    verbose_name='ID')),
+                ('page', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='wagtailnest_public_entries',
+                    related_query_name='wagtailnest_public',
+                    to='wagtailcore.Page')),
+                ('site', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='+', to='wagtailcore.Site')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='publicpage',
+            unique_together={('site', 'page')},
+        ),
+    ]
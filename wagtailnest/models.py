@@ -0,0 +1,51 @@
+"""Denormalised page data kept in step by wagtailnest's signal handlers."""
+from django.db import models, transaction
+from wagtail.core.models import Page, Site
+
+
+class PublicPage(models.Model):
+    """A live page outside any view restriction, under a site's root.
+
+    A page under more than one site root has a row per site, so filtering
+    on ``wagtailnest_public__site`` replaces ``live().public()`` and
+    ``descendant_of(site.root_page)`` with a single indexed join.
+    """
+
+    site = models.ForeignKey(
+        Site, on_delete=models.CASCADE, related_name='+')
+    page = models.ForeignKey(
+        Page, on_delete=models.CASCADE,
+        related_name='wagtailnest_public_entries',
+        related_query_name='wagtailnest_public')
+
+    class Meta:
+        unique_together = ('site', 'page')
+
+    @classmethod
+    def rebuild(cls, root=None, descendants=True):
+        """Recompute the rows for ``root`` (and descendants), or all rows."""
+        if root is None:
+            scope = {}
+        elif descendants:
+            scope = {'path__startswith': root.path}
+        else:
+            scope = {'pk': root.pk}
+        rows = []
+        with transaction.atomic():
+            cls.objects.filter(**{
+                'page__{}'.format(key): value
+                for key, value in scope.items()}).delete()
+            for site in Site.objects.select_related('root_page'):
+                page_ids = Page.objects.live().public().descendant_of(
+                    site.root_page, inclusive=True).filter(
+                        **scope).values_list('pk', flat=True)
+                rows += [
+                    cls(site_id=site.pk, page_id=page_id)
+                    for page_id in page_ids.iterator()]
+            cls.objects.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+    @staticmethod
+    def filter_public(queryset, site):
+        """Narrow a page queryset to live, public pages of ``site``."""
+        return queryset.filter(wagtailnest_public__site=site)
@@ -0,0 +1,100 @@
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from rest_framework.response import Response
+from wagtail.api.v2.pagination import WagtailPagination
+from wagtail.api.v2.utils import BadRequestError
+
+
+class CursorPagination(WagtailPagination):
+    """Keyset pagination over the view's ``cursor_ordering``.
+
+    Requests opt in by passing ``cursor`` (empty for the first page); every
+    response then carries the opaque, signed ``next_cursor`` to pass on.
+    Without ``cursor`` this falls back to offset/limit pagination.
+    """
+
+    cursor_query_param = 'cursor'
+    unsupported_query_params = ['offset', 'order', 'search']
+    salt = 'wagtailnest.pagination.CursorPagination'
+    ordering = None
+    next_cursor = None
+
+    @staticmethod
+    def get_limit(request):
+        limit_max = getattr(settings, 'WAGTAILAPI_LIMIT_MAX', 20)
+        limit_default = 20 if not limit_max else min(20, limit_max)
+        try:
+            limit = int(request.GET.get('limit', limit_default))
+            if limit_max and limit > limit_max:
+                raise BadRequestError(
+                    "limit cannot be higher than %d" % limit_max)
+            assert limit >= 0
+        except (ValueError, AssertionError):
+            raise BadRequestError("limit must be a positive integer")
+        return limit
+
+    def encode_cursor(self, instance):
+        values = []
+        for key in self.ordering:
+            value = getattr(instance, key.lstrip('-'))
+            values.append(
+                value.isoformat() if hasattr(value, 'isoformat') else value)
+        return signing.dumps(values, salt=self.salt, compress=True)
+
+    def decode_cursor(self, model, token):
+        try:
+            values = signing.loads(token, salt=self.salt)
+        except signing.BadSignature:
+            raise BadRequestError("cursor is invalid")
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise BadRequestError("cursor is invalid")
+        # pylint: disable=protected-access
+        return [
+            model._meta.get_field(key.lstrip('-')).to_python(value)
+            for key, value in zip(self.ordering, values)]
+
+    def get_keyset_q(self, values):
+        """Match rows after ``values`` in ``ordering``, key by key."""
+        query = Q()
+        equal = Q()
+        for key, value in zip(self.ordering, values):
+            name = key.lstrip('-')
+            lookup = '{}__{}'.format(name, 'lt' if key[0] == '-' else 'gt')
+            query |= equal & Q(**{lookup: value})
+            equal &= Q(**{name: value})
+        return query
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.ordering = getattr(view, 'cursor_ordering', None)
+        if not self.ordering or self.cursor_query_param not in request.GET:
+            self.ordering = None
+            return super().paginate_queryset(queryset, request, view)
+        for param in self.unsupported_query_params:
+            if param in request.GET:
+                raise BadRequestError(
+                    "%s is not supported with cursor pagination" % param)
+        self.view = view
+        limit = self.get_limit(request)
+        queryset = queryset.order_by(*self.ordering)
+        token = request.GET[self.cursor_query_param]
+        if token:
+            values = self.decode_cursor(queryset.model, token)
+            queryset = queryset.filter(self.get_keyset_q(values))
+        items = list(queryset[:limit + 1])
+        self.next_cursor = None
+        if limit and len(items) > limit:
+            self.next_cursor = self.encode_cursor(items[limit - 1])
+        return items[:limit]
+
+    def get_paginated_response(self, data):
+        if self.ordering is None:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('meta', OrderedDict([
+                ('next_cursor', self.next_cursor),
+            ])),
+            ('items', data),
+        ]))
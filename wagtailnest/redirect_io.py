@@ -0,0 +1,228 @@
+"""Streaming bulk import and export of redirects as CSV or NDJSON."""
+import csv
+import json
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from wagtail.contrib.redirects.models import Redirect
+from wagtail.core.models import Page, Site
+
+from wagtailnest.redirects import get_redirect_index
+
+FIELDS = ['site', 'old_path', 'is_permanent', 'redirect_page', 'redirect_link']
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'f'}
+
+
+class Echo:
+    """A write-only buffer handing csv.writer's output straight back."""
+
+    def write(self, value):  # pylint: disable=no-self-use
+        return value
+
+
+def export_rows(fmt):
+    """Yield every redirect as CSV or NDJSON lines, oldest first.
+
+    ``iterator`` streams through a server-side cursor where the database
+    supports one, so memory stays flat however many redirects there are.
+    """
+    rows = Redirect.objects.order_by('pk').values_list(
+        'site_id', 'old_path', 'is_permanent', 'redirect_page_id',
+        'redirect_link').iterator()
+    if fmt == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(FIELDS)
+        for row in rows:
+            yield writer.writerow(['' if val is None else val for val in row])
+    else:
+        for row in rows:
+            yield json.dumps(dict(zip(FIELDS, row))) + '\n'
+
+
+def parse_rows(lines, fmt):
+    """Yield ``(line_number, row_dict_or_error)`` from text lines."""
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield (reader.line_num, row)
+        return
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as err:
+            yield (line_number, ValidationError(str(err)))
+            continue
+        if not isinstance(row, dict):
+            row = ValidationError('Expected a JSON object')
+        yield (line_number, row)
+
+
+def _parse_bool(value, default):
+    if value in (None, ''):
+        return default
+    if isinstance(value, bool):
+        return value
+    value = str(value).strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValidationError({'is_permanent': 'Not a boolean: {}'.format(value)})
+
+
+def _parse_optional_int(name, value):
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValidationError({name: 'Not an id: {}'.format(value)})
+
+
+class RedirectImporter:
+    """Validate redirect rows in chunks and upsert them in bulk.
+
+    Each chunk is written in its own transaction. Invalid rows are reported
+    in ``errors`` as ``(line_number, messages)`` without stopping the run.
+    Existing redirects are matched on site and normalised old_path.
+    """
+
+    def __init__(self, chunk_size=1000):
+        self.chunk_size = chunk_size
+        self.created = 0
+        self.updated = 0
+        self.errors = []  # type: list
+        self.sites = {}  # type: dict
+        for site in Site.objects.all():
+            self.sites[str(site.pk)] = site.pk
+            self.sites[site.hostname] = site.pk
+
+    def build(self, row):
+        unknown = set(row) - set(FIELDS)
+        if unknown:
+            raise ValidationError(
+                'Unknown fields: {}'.format(', '.join(sorted(unknown))))
+        site = row.get('site')
+        site_id = None
+        if site not in (None, ''):
+            if str(site) not in self.sites:
+                raise ValidationError({'site': 'No such site: {}'.format(
+                    site)})
+            site_id = self.sites[str(site)]
+        redirect = Redirect(
+            site_id=site_id,
+            old_path=Redirect.normalise_path(row.get('old_path') or ''),
+            is_permanent=_parse_bool(row.get('is_permanent'), True),
+            redirect_page_id=_parse_optional_int(
+                'redirect_page', row.get('redirect_page')),
+            redirect_link=row.get('redirect_link') or '',
+        )
+        if not row.get('old_path'):
+            raise ValidationError({'old_path': 'This field is required.'})
+        if not redirect.redirect_page_id and not redirect.redirect_link:
+            raise ValidationError(
+                'Either redirect_page or redirect_link is required.')
+        redirect.clean_fields(exclude=['site', 'redirect_page'])
+        return redirect
+
+    def import_chunk(self, chunk):
+        redirects = {}
+        for line_number, row in chunk:
+            try:
+                if isinstance(row, ValidationError):
+                    raise row
+                redirect = self.build(row)
+            except ValidationError as err:
+                self.errors.append((line_number, err.messages))
+                continue
+            # A later row for the same path wins, as it would row by row
+            redirects[(redirect.site_id, redirect.old_path)] = (
+                line_number, redirect)
+        page_ids = set(
+            redirect.redirect_page_id for _, redirect in redirects.values()
+            if redirect.redirect_page_id)
+        known_pages = set(Page.objects.filter(
+            pk__in=page_ids).values_list('pk', flat=True))
+        for key, (line_number, redirect) in list(redirects.items()):
+            page_id = redirect.redirect_page_id
+            if page_id and page_id not in known_pages:
+                self.errors.append(
+                    (line_number, ['No such page: {}'.format(page_id)]))
+                del redirects[key]
+        existing = {
+            (redirect.site_id, redirect.old_path): redirect
+            for redirect in Redirect.objects.filter(old_path__in=set(
+                old_path for _, old_path in redirects))
+        }
+        to_create, to_update = [], []
+        for key, (_, redirect) in redirects.items():
+            if key in existing:
+                redirect.pk = existing[key].pk
+                to_update.append(redirect)
+            else:
+                to_create.append(redirect)
+        with transaction.atomic():
+            Redirect.objects.bulk_create(to_create)
+            bulk_update(to_update, FIELDS[1:])
+        self.created += len(to_create)
+        self.updated += len(to_update)
+
+    @staticmethod
+    def read(rows):
+        """Yield rows, then an error row if the input stops decoding."""
+        line_number = 0
+        try:
+            for line_number, row in rows:
+                yield (line_number, row)
+        except UnicodeDecodeError as err:
+            yield (line_number + 1, ValidationError(
+                'Not valid UTF-8: {}'.format(err.reason)))
+
+    def run(self, rows):
+        rows = self.read(rows)
+        try:
+            while True:
+                chunk = list(islice(rows, self.chunk_size))
+                if not chunk:
+                    break
+                self.import_chunk(chunk)
+        finally:
+            # Chunks commit one by one, so index those done before a failure
+            transaction.on_commit(get_redirect_index().invalidate)
+        return self
+
+    def report(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'errors': [
+                {'line': line, 'messages': messages}
+                for line, messages in self.errors],
+        }
+
+
+def bulk_update(redirects, fields):
+    """Use QuerySet.bulk_update where Django has it (2.2+)."""
+    fields = [
+        '{}_id'.format(field) if field == 'redirect_page' else field
+        for field in fields]
+    if hasattr(Redirect.objects, 'bulk_update'):
+        Redirect.objects.bulk_update(redirects, fields)
+        return
+    for redirect in redirects:
+        Redirect.objects.filter(pk=redirect.pk).update(**{
+            field: getattr(redirect, field) for field in fields})
+
+
+def import_rows(lines, fmt, chunk_size=1000):
+    """Import redirects from text lines; returns the importer's report."""
+    rows = parse_rows(lines, fmt)
+    return RedirectImporter(chunk_size).run(rows).report()
@@ -0,0 +1,178 @@
+"""In-memory redirect matching."""
+from collections import defaultdict
+from threading import RLock
+from urllib.parse import urlparse
+
+from django import http
+from django.conf import settings
+from django.utils.encoding import uri_to_iri
+from wagtail.contrib.redirects.middleware import (
+    RedirectMiddleware as WagtailRedirectMiddleware)
+from wagtail.contrib.redirects.models import Redirect
+from wagtail.core.models import Page
+
+from wagtailnest.cache import get_cache_backend
+
+
+class RedirectIndex:
+    """Redirects hashed by site and normalised ``old_path``.
+
+    The index is built on first use and patched in place as redirects are
+    saved or deleted. With a shared cache ``backend``, each change also
+    bumps a generation number so other processes rebuild their copy.
+    """
+
+    generation_key = 'wagtailnest:redirects:generation'
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self._sites = None  # type: dict
+        self._keys = {}  # type: dict
+        self._generation = None
+        self._lock = RLock()
+
+    def _shared_generation(self):
+        if self.backend is None:
+            return None
+        return self.backend.get_or_set(self.generation_key, 0, None)
+
+    @staticmethod
+    def _add(sites, keys, redirect):
+        pk, site_id, old_path = redirect[:3]
+        sites[site_id][old_path] = redirect
+        keys[pk] = (site_id, old_path)
+
+    def _remove(self, pk):
+        site_id, old_path = self._keys.pop(pk, (None, None))
+        paths = self._sites.get(site_id, {})
+        if paths.get(old_path, (None,))[0] == pk:
+            del paths[old_path]
+
+    def build(self):
+        sites = defaultdict(dict)  # type: dict
+        keys = {}  # type: dict
+        generation = self._shared_generation()
+        redirects = Redirect.objects.values_list(
+            'pk', 'site_id', 'old_path', 'is_permanent', 'redirect_page_id',
+            'redirect_link')
+        for redirect in redirects.iterator():
+            self._add(sites, keys, redirect)
+        with self._lock:
+            self._sites, self._keys = sites, keys
+            self._generation = generation
+
+    def _ensure_built(self):
+        """Return the current index, taken under the lock."""
+        stale = self._shared_generation() != self._generation
+        with self._lock:
+            if self._sites is None or stale:
+                self.build()
+            return self._sites
+
+    def _bump_generation(self):
+        if self.backend is None:
+            return
+        expected = (self._generation or 0) + 1
+        try:
+            self._generation = self.backend.incr(self.generation_key)
+        except ValueError:
+            self.backend.set(self.generation_key, 1, None)
+            self._generation = 1
+        if self._generation != expected:
+            self._sites = None  # Another process changed redirects too
+
+    def update(self, redirect):
+        with self._lock:
+            if self._sites is not None:
+                self._remove(redirect.pk)
+                self._add(self._sites, self._keys, (
+                    redirect.pk, redirect.site_id, redirect.old_path,
+                    redirect.is_permanent, redirect.redirect_page_id,
+                    redirect.redirect_link))
+            self._bump_generation()
+
+    def invalidate(self):
+        """Rebuild on next use, e.g. after changes that skip signals."""
+        with self._lock:
+            self._sites = None
+            self._bump_generation()
+
+    def remove(self, pk):
+        with self._lock:
+            if self._sites is not None:
+                self._remove(pk)
+            self._bump_generation()
+
+    @staticmethod
+    def _get(sites, site_id, path):
+        """Prefer a site's own redirect to one for all sites."""
+        entry = sites.get(site_id, {}).get(path)
+        if entry is None and site_id is not None:
+            entry = sites.get(None, {}).get(path)
+        return entry
+
+    def find(self, site_id, path):
+        """Match as Wagtail does: as given, unencoded, then without query.
+
+        Returns ``(pk, site_id, old_path, is_permanent, redirect_page_id,
+        redirect_link)`` or None.
+        """
+        sites = self._ensure_built()
+        path_without_query = urlparse(path).path
+        candidates = [path, uri_to_iri(path)]
+        if path_without_query != path:
+            candidates += [
+                path_without_query, uri_to_iri(path_without_query)]
+        for candidate in candidates:
+            entry = self._get(sites, site_id, candidate)
+            if entry is not None:
+                return entry
+        return None
+
+
+def get_redirect_link(entry):
+    page_id, link = entry[4:]
+    if page_id is not None:
+        page = Page.objects.filter(pk=page_id).first()
+        if page is not None:
+            return page.url
+    return link
+
+
+_redirect_index = None
+
+
+def get_redirect_index():
+    """Return the process-wide RedirectIndex."""
+    global _redirect_index  # pylint: disable=global-statement
+    if _redirect_index is None:
+        _redirect_index = RedirectIndex(
+            get_cache_backend(settings.WAGTAILNEST.REDIRECTS['BACKEND']))
+    return _redirect_index
+
+
+class RedirectMiddleware(WagtailRedirectMiddleware):
+    """Wagtail's RedirectMiddleware, matched against the RedirectIndex.
+
+    The index is only used with a shared REDIRECTS['BACKEND']: without
+    one, a process never sees redirects changed by the others, so each
+    request queries the database as Wagtail does.
+    """
+
+    def process_response(self, request, response):
+        index = get_redirect_index()
+        if index.backend is None:
+            return super().process_response(request, response)
+        if response.status_code != 404 or not hasattr(request, 'site'):
+            return response
+        path = Redirect.normalise_path(request.get_full_path())
+        site_id = getattr(request.site, 'pk', None)
+        entry = index.find(site_id, path)
+        if entry is None:
+            return response
+        link = get_redirect_link(entry)
+        if not link:
+            return response
+        if entry[3]:
+            return http.HttpResponsePermanentRedirect(link)
+        return http.HttpResponseRedirect(link)
@@ -0,0 +1,124 @@
+"""Rendition generation off the request path."""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.db import close_old_connections
+from rest_framework.settings import import_from_string
+from wagtail.images import get_image_model
+from wagtail.images.exceptions import InvalidFilterSpecError
+from wagtail.images.models import SourceImageIOError
+
+from wagtailnest.cache import get_cache_backend
+
+logger = logging.getLogger(__name__)
+
+
+class RenditionQueue:
+    """Queue renditions for generation, at most once per image and spec.
+
+    A key is locked in-process and, when ``backend`` is a shared Django
+    cache, across processes via ``cache.add``. Locks expire after
+    ``lock_timeout`` seconds so a lost job is retried eventually.
+
+    Subclasses implement ``enqueue``; a task-queue adapter would send a
+    task that calls ``generate(image_id, filter_spec)`` on a worker.
+    """
+
+    lock_timeout = 300
+
+    def __init__(self, backend=None, max_workers=1):
+        self.backend = backend
+        self.max_workers = max_workers
+        self._pending = {}  # type: dict
+        self._lock = Lock()
+
+    @staticmethod
+    def _lock_key(image_id, filter_spec):
+        return 'wagtailnest:renditions:lock:{}:{}'.format(
+            image_id, filter_spec)
+
+    def acquire(self, image_id, filter_spec):
+        key = (str(image_id), filter_spec)
+        now = monotonic()
+        with self._lock:
+            started = self._pending.get(key)
+            if started is not None and now - started < self.lock_timeout:
+                return False
+            self._pending[key] = now
+        if self.backend is not None and not self.backend.add(
+                self._lock_key(*key), 1, self.lock_timeout):
+            return False
+        return True
+
+    def release(self, image_id, filter_spec):
+        key = (str(image_id), filter_spec)
+        with self._lock:
+            self._pending.pop(key, None)
+        if self.backend is not None:
+            self.backend.delete(self._lock_key(*key))
+
+    def submit(self, image_id, filter_spec):
+        """Queue a rendition unless it is already queued; True if queued."""
+        if not self.acquire(image_id, filter_spec):
+            return False
+        try:
+            self.enqueue(image_id, filter_spec)
+        except Exception:
+            self.release(image_id, filter_spec)
+            raise
+        return True
+
+    def enqueue(self, image_id, filter_spec):
+        raise NotImplementedError
+
+    def generate(self, image_id, filter_spec):
+        try:
+            image = get_image_model().objects.filter(pk=image_id).first()
+            if image is not None:
+                image.get_rendition(filter_spec)
+        except (InvalidFilterSpecError, SourceImageIOError) as err:
+            logger.warning(
+                'Could not generate rendition %s for image %s: %s',
+                filter_spec, image_id, err)
+        finally:
+            self.release(image_id, filter_spec)
+
+
+class ThreadPoolRenditionQueue(RenditionQueue):
+    """Generate renditions in a pool of threads in this process."""
+
+    def __init__(self, backend=None, max_workers=1):
+        super().__init__(backend, max_workers)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def enqueue(self, image_id, filter_spec):
+        self.executor.submit(self.run, image_id, filter_spec)
+
+    def run(self, image_id, filter_spec):
+        close_old_connections()
+        try:
+            self.generate(image_id, filter_spec)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception(
+                'Failed to generate rendition %s for image %s',
+                filter_spec, image_id)
+        finally:
+            close_old_connections()
+
+
+_rendition_queue = None
+
+
+def get_rendition_queue():
+    """Return the process-wide RenditionQueue configured in settings."""
+    global _rendition_queue  # pylint: disable=global-statement
+    if _rendition_queue is None:
+        conf = settings.WAGTAILNEST.RENDITIONS
+        queue_class = import_from_string(conf['QUEUE'], 'QUEUE')
+        _rendition_queue = queue_class(
+            backend=get_cache_backend(conf['LOCK_BACKEND']),
+            max_workers=conf['WORKERS'])
+    return _rendition_queue
@@ -0,0 +1,193 @@
+"""Render stored rich text to front-end HTML, many fragments at a time."""
+from hashlib import sha1
+from time import monotonic
+
+from django.conf import settings
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from wagtail.core.blocks import RichTextBlock
+from wagtail.core.models import Page
+from wagtail.core.rich_text import RichText, features
+
+from wagtailnest.cache import LRUCache
+
+try:
+    from wagtail.core.rich_text.pages import page_linktype_handler
+    from wagtail.core.rich_text.rewriters import (
+        FIND_A_TAG, EmbedRewriter, LinkRewriter, MultiRuleRewriter,
+        extract_attrs)
+except ImportError:  # Wagtail 2.5+, whose rules are handler classes
+    page_linktype_handler = None
+
+# What Wagtail's rules expand a missing page, document, image or embed to
+UNRESOLVED = ('<a>', '<img>', '')
+
+
+def memoize_rule(rule, memo, trace):
+    """Wrap a rewriter rule so equal tags are expanded once per pass.
+
+    Every expansion is appended to ``trace``, memoized or not.
+    """
+    def expand(attrs):
+        key = (rule, tuple(sorted(attrs.items())))
+        if key not in memo:
+            memo[key] = rule(attrs)
+        trace.append(memo[key])
+        return memo[key]
+    return expand
+
+
+class RichTextConverter:
+    """Convert rich text as ``str(RichTextBlock().to_python(value))`` does.
+
+    One block and the registered link and embed rules are shared by every
+    call. Results are kept in an LRU keyed by a hash of the source, and
+    ``convert_many`` expands each distinct link or embed once and loads
+    all linked pages in one query per page type. Fragments with a link or
+    embed that didn't resolve are not cached, as its object may be created
+    later. Entries expire after ``local_timeout`` seconds, which bounds how
+    long other processes keep serving links to pages moved by this one.
+    """
+
+    def __init__(self, maxsize=1000, maxbytes=None, local_timeout=None):
+        self.block = RichTextBlock()
+        self.cache = LRUCache(maxsize, maxbytes)
+        self.local_timeout = local_timeout
+        self._rules = None
+
+    @property
+    def rules(self):
+        if self._rules is None:
+            self._rules = (features.get_link_types(),
+                           features.get_embed_types())
+        return self._rules
+
+    @staticmethod
+    def get_key(value):
+        return sha1(value.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def get_page_ids(values):
+        ids = set()
+        for value in values:
+            for match in FIND_A_TAG.finditer(value):
+                attrs = extract_attrs(match.group(1))
+                if attrs.get('linktype') == 'page':
+                    try:
+                        ids.add(int(attrs['id']))
+                    except (KeyError, ValueError):
+                        continue
+        return ids
+
+    @staticmethod
+    def page_link_rule(pages):
+        """Wagtail's page link rule, over pages loaded up front."""
+        def expand(attrs):
+            try:
+                page = pages.get(int(attrs['id']))
+            except (KeyError, ValueError):
+                page = None
+            if page is None:
+                return '<a>'
+            return '<a href="{}">'.format(escape(page.url))
+        return expand
+
+    def get_rewriter(self, values, trace):
+        link_rules, embed_rules = self.rules
+        link_rules = dict(link_rules)
+        # Custom page rules may need more than the url, so only replace ours
+        if link_rules.get('page') is page_linktype_handler:
+            ids = self.get_page_ids(values)
+            pages = {}
+            if ids:
+                pages = {
+                    page.pk: page
+                    for page in Page.objects.filter(pk__in=ids).specific()}
+            link_rules['page'] = self.page_link_rule(pages)
+        memo = {}  # type: dict
+        return MultiRuleRewriter([
+            LinkRewriter({
+                name: memoize_rule(rule, memo, trace)
+                for name, rule in link_rules.items()}),
+            EmbedRewriter({
+                name: memoize_rule(rule, memo, trace)
+                for name, rule in embed_rules.items()}),
+        ])
+
+    def get_cached(self, key):
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        expires, html = entry
+        if expires is not None and expires < monotonic():
+            self.cache.pop(key)
+            return None
+        return html
+
+    def set_cached(self, key, html):
+        expires = None
+        if self.local_timeout is not None:
+            expires = monotonic() + self.local_timeout
+        self.cache.set(key, (expires, html), len(html))
+
+    def convert(self, value):
+        return self.convert_many([value])[0]
+
+    def convert_many(self, values):
+        """Convert a list of values; anything but strings passes through."""
+        results = list(values)
+        misses = {}  # type: dict
+        for index, value in enumerate(results):
+            if not isinstance(value, str):
+                continue
+            key = self.get_key(value)
+            html = self.get_cached(key)
+            if html is None:
+                misses.setdefault(key, []).append(index)
+            else:
+                results[index] = html
+        if not misses:
+            return results
+        sources = {
+            key: self.block.to_python(results[indexes[0]]).source
+            for key, indexes in misses.items()}
+        for key, html, resolved in self.render(sources):
+            if resolved:
+                self.set_cached(key, html)
+            for index in misses[key]:
+                results[index] = html
+        return results
+
+    def render(self, sources):
+        """Yield ``(key, html, resolved)`` for each of ``{key: source}``."""
+        if page_linktype_handler is None:
+            for key, source in sources.items():
+                html = str(RichText(source))
+                yield key, html, '<a>' not in html
+            return
+        trace = []  # type: list
+        rewrite = self.get_rewriter(sources.values(), trace)
+        for key, source in sources.items():
+            del trace[:]
+            # As RichText.__html__ wraps the expanded source
+            html = mark_safe(
+                '<div class="rich-text">{}</div>'.format(rewrite(source)))
+            yield key, html, not any(
+                result in UNRESOLVED for result in trace)
+
+    def clear(self):
+        self.cache.clear()
+
+
+_richtext_converter = None
+
+
+def get_richtext_converter():
+    """Return the process-wide RichTextConverter configured in settings."""
+    global _richtext_converter  # pylint: disable=global-statement
+    if _richtext_converter is None:
+        conf = settings.WAGTAILNEST.RICHTEXT_CACHE
+        _richtext_converter = RichTextConverter(
+            maxsize=conf['MAX_ENTRIES'], maxbytes=conf['MAX_BYTES'],
+            local_timeout=conf['LOCAL_TIMEOUT'])
+    return _richtext_converter
@@ -6,6 +6,8 @@ from wagtail.api.v2.router import WagtailAPIRouter
 from wagtail.admin import urls as wagtailadmin_urls
 from wagtail.core import urls as wagtailcore_urls
 
+from wagtailnest.instrumentation import prometheus_view
+
 
 def _wt_router():
     router = WagtailAPIRouter('wagtailapi')
@@ -20,6 +22,10 @@ def _wt_router():
     for route, name in routes:
         endpoint = import_from_string(endpoints[name], name)
         router.register_endpoint(route, endpoint)
+    # Detail URLs link to the first endpoint registered for a model, so
+    # pages_batch, which also serves Page, comes after everything else
+    router.register_endpoint('pages_batch', import_from_string(
+        endpoints['PAGES_BATCH'], 'PAGES_BATCH'))
     return router
 
 
@@ -64,6 +70,7 @@ urlpatterns = [
         url(r'^api/v1/', include([
             url(r'', wt_router.urls),
             url(r'^cms/', include(_serve_views())),
+            url(r'^metrics/$', prometheus_view, name='wagtailnest_metrics'),
         ])),
         url(r'^pages/', include(_frontend_redirects())),
         url(r'', include(wagtailadmin_urls)),
@@ -1,4 +1,5 @@
 from dj_core_drf.serializers import ModelSerializer
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import MultipleObjectsReturned
 from rest_framework import serializers
@@ -10,6 +11,7 @@ from wagtail.embeds.embeds import get_embed
 from wagtail.embeds.models import Embed
 from wagtail.images.api.v2.serializers import ImageSerializer
 
+from wagtailnest.embeds import get_embed_cache
 from wagtailnest.utils import get_root_relative_url
 
 User = get_user_model()
@@ -69,6 +71,9 @@ class EmbedSerializer(ModelSerializer):
     def for_url(cls, url):
         if url == "":
             return None
+        if settings.WAGTAILNEST.EMBED_CACHE['ENABLED']:
+            embed = get_embed_cache().get(url)
+            return None if embed is None else cls(embed)
         try:
             embed = get_embed(url)
         except MultipleObjectsReturned:
@@ -78,3 +83,18 @@ class EmbedSerializer(ModelSerializer):
             embed.delete()
             embed = get_embed(url)
         return cls(embed)
+
+    @classmethod
+    def for_urls(cls, urls):
+        """Resolve several URLs at once; returns ``{url: serializer}``.
+
+        Known embeds are loaded in one query and unknown ones fetched
+        concurrently, so a listing doesn't wait on each provider in turn.
+        """
+        urls = set(urls)
+        if not settings.WAGTAILNEST.EMBED_CACHE['ENABLED']:
+            return {url: cls.for_url(url) for url in urls}
+        embeds = get_embed_cache().get_many(urls)
+        return {
+            url: None if embeds.get(url) is None else cls(embeds[url])
+            for url in urls}
@@ -0,0 +1,252 @@
+"""Signal handlers keeping wagtailnest's caches in step with the database."""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_save)
+from wagtail.contrib.redirects.models import Redirect
+from wagtail.core.models import (GroupPagePermission, Page,
+                                 PageViewRestriction, Site)
+from wagtail.core.signals import page_published, page_unpublished
+from wagtail.documents.models import get_document_model
+from wagtail.embeds.models import Embed
+from wagtail.images import get_image_model
+
+from wagtailnest.cache import (get_permission_cache, get_rendition_cache,
+                               get_response_cache, get_route_cache,
+                               site_registry)
+from wagtailnest.embeds import get_embed_cache
+from wagtailnest.models import PublicPage
+from wagtailnest.redirects import get_redirect_index
+from wagtailnest.richtext import get_richtext_converter
+from wagtailnest.snapshot import update_snapshot
+from wagtailnest.utils import nonraw_signal_handler
+
+
+@nonraw_signal_handler
+def clear_route_cache(sender, **kwargs):  # pylint: disable=unused-argument
+    instance = kwargs.get('instance')
+    if not isinstance(instance, (Page, PageViewRestriction, Site)):
+        return
+    route_cache = get_route_cache()
+    if route_cache is not None:
+        route_cache.clear()
+
+
+@nonraw_signal_handler
+def clear_site_registry(sender, **kwargs):  # pylint: disable=unused-argument
+    instance = kwargs.get('instance')
+    if isinstance(instance, Site) or (
+            isinstance(instance, Page) and
+            site_registry.is_root_page(instance.pk)):
+        site_registry.clear()
+
+
+def purge_response_cache(sender, **kwargs):  # pylint: disable=unused-argument
+    response_cache = get_response_cache()
+    if response_cache is not None:
+        response_cache.purge(kwargs['instance'].pk)
+
+
+@nonraw_signal_handler
+def purge_moved_responses(sender, **kwargs):  # pylint: disable=unused-argument
+    instance = kwargs.get('instance')
+    if not getattr(instance, '_wagtailnest_moved', False):
+        return
+    response_cache = get_response_cache()
+    if response_cache is None:
+        return
+    # url_path and html_url of the whole subtree changed with this page's
+    # url_path; purge once committed so no request re-caches the old ones
+    page_ids = list(Page.objects.descendant_of(
+        instance, inclusive=True).values_list('pk', flat=True))
+
+    def purge():
+        for page_id in page_ids:
+            response_cache.purge(page_id)
+    transaction.on_commit(purge)
+
+
+@nonraw_signal_handler
+def clear_permission_cache(sender, **kwargs):
+    # pylint: disable=unused-argument
+    if kwargs.get('update_fields') == frozenset(['last_login']):
+        return  # Logging in doesn't change permissions
+    permission_cache = get_permission_cache()
+    if permission_cache is not None:
+        permission_cache.clear()
+
+
+@nonraw_signal_handler
+def clear_moved_permissions(sender, **kwargs):
+    # pylint: disable=unused-argument
+    # Cached prefixes of a moved page could now cover a different subtree
+    if not getattr(kwargs.get('instance'), '_wagtailnest_moved', False):
+        return
+    permission_cache = get_permission_cache()
+    if permission_cache is not None:
+        permission_cache.clear()
+
+
+@nonraw_signal_handler
+def clear_rendition_cache(sender, **kwargs):
+    # pylint: disable=unused-argument
+    rendition_cache = get_rendition_cache()
+    if rendition_cache is not None:
+        rendition_cache.clear()
+
+
+@nonraw_signal_handler
+def update_redirect_index(sender, **kwargs):
+    # pylint: disable=unused-argument
+    redirect = kwargs['instance']
+    # Once committed, so no process rebuilds without it and counts as current
+    transaction.on_commit(lambda: get_redirect_index().update(redirect))
+
+
+def remove_from_redirect_index(sender, **kwargs):
+    # pylint: disable=unused-argument
+    pk = kwargs['instance'].pk
+    transaction.on_commit(lambda: get_redirect_index().remove(pk))
+
+
+def remove_from_embed_cache(sender, **kwargs):
+    # pylint: disable=unused-argument
+    if settings.WAGTAILNEST.EMBED_CACHE['ENABLED']:
+        get_embed_cache().entries.pop(kwargs['instance'].url)
+
+
+@nonraw_signal_handler
+def check_page_moved(sender, **kwargs):  # pylint: disable=unused-argument
+    instance = kwargs.get('instance')
+    if not isinstance(instance, Page) or instance.pk is None:
+        return
+    # A move or slug change alters url_path before the page is saved
+    url_path = Page.objects.filter(pk=instance.pk).values_list(
+        'url_path', flat=True).first()
+    # pylint: disable=protected-access
+    instance._wagtailnest_moved = url_path != instance.url_path
+
+
+@nonraw_signal_handler
+def update_public_pages(sender, **kwargs):  # pylint: disable=unused-argument
+    if not settings.WAGTAILNEST.PUBLIC_PAGE_INDEX['ENABLED']:
+        return
+    instance = kwargs.get('instance')
+    if isinstance(instance, Page):
+        PublicPage.rebuild(instance, descendants=getattr(
+            instance, '_wagtailnest_moved', False))
+    elif isinstance(instance, PageViewRestriction):
+        page = Page.objects.filter(pk=instance.page_id).first()
+        if page is not None:
+            PublicPage.rebuild(page)
+    elif isinstance(instance, Site):
+        PublicPage.rebuild()
+
+
+@nonraw_signal_handler
+def clear_richtext_cache(sender, **kwargs):  # pylint: disable=unused-argument
+    instance = kwargs.get('instance')
+    if not isinstance(instance, (Page, Site, get_image_model(),
+                                 get_document_model(), Embed)):
+        return
+    # Fragments linking to ids that didn't exist yet are never cached
+    if kwargs.get('created'):
+        return
+    if isinstance(instance, Page) and kwargs.get('signal') is post_save and (
+            not getattr(instance, '_wagtailnest_moved', False)):
+        return  # e.g. publishing, which leaves page URLs alone
+    get_richtext_converter().clear()
+
+
+@nonraw_signal_handler
+def refresh_snapshot(sender, **kwargs):  # pylint: disable=unused-argument
+    conf = settings.WAGTAILNEST.SNAPSHOT
+    if not conf['ON_PUBLISH'] or not conf['DIRECTORY']:
+        return
+    instance = kwargs.get('instance')
+    if isinstance(instance, PageViewRestriction):
+        page = Page.objects.filter(pk=instance.page_id).first()
+        if page is None:
+            return
+        pages = list(Page.objects.descendant_of(page, inclusive=True))
+    elif isinstance(instance, Page):
+        # Saves other than moves are covered by page_published
+        if kwargs.get('signal') is post_save and not getattr(
+                instance, '_wagtailnest_moved', False):
+            return
+        pages = [instance]
+    else:
+        return
+    # Render what was committed, after the saving request's transaction
+    transaction.on_commit(lambda: update_snapshot(pages))
+
+
+def register_signal_handlers():
+    # Page subclasses send post_save/post_delete under their own sender, and
+    # Page.move only emits post_save, so listen without a sender filter.
+    for signal in [page_published, page_unpublished, post_save, post_delete]:
+        signal.connect(
+            clear_route_cache,
+            dispatch_uid='wagtailnest_clear_route_cache')
+    for signal in [post_save, post_delete]:
+        signal.connect(
+            clear_site_registry,
+            dispatch_uid='wagtailnest_clear_site_registry')
+    for signal in [page_published, page_unpublished]:
+        signal.connect(
+            purge_response_cache,
+            dispatch_uid='wagtailnest_purge_response_cache')
+    post_save.connect(
+        purge_moved_responses,
+        dispatch_uid='wagtailnest_purge_moved_responses')
+    User = get_user_model()  # pylint: disable=invalid-name
+    for sender in [GroupPagePermission, User]:
+        for signal in [post_save, post_delete]:
+            signal.connect(
+                clear_permission_cache, sender=sender,
+                dispatch_uid='wagtailnest_clear_permission_cache')
+    m2m_changed.connect(
+        clear_permission_cache, sender=User.groups.through,
+        dispatch_uid='wagtailnest_clear_permission_cache')
+    post_save.connect(
+        clear_moved_permissions,
+        dispatch_uid='wagtailnest_clear_moved_permissions')
+    Image = get_image_model()  # pylint: disable=invalid-name
+    for signal in [post_save, post_delete]:
+        signal.connect(
+            clear_rendition_cache, sender=Image,
+            dispatch_uid='wagtailnest_clear_rendition_cache')
+    # New renditions only fill misses, so only deletions need clearing
+    post_delete.connect(
+        clear_rendition_cache, sender=Image.get_rendition_model(),
+        dispatch_uid='wagtailnest_clear_rendition_cache')
+    post_save.connect(
+        update_redirect_index, sender=Redirect,
+        dispatch_uid='wagtailnest_update_redirect_index')
+    post_delete.connect(
+        remove_from_redirect_index, sender=Redirect,
+        dispatch_uid='wagtailnest_remove_from_redirect_index')
+    # Publishing and unpublishing save the page, so post_save covers them
+    pre_save.connect(
+        check_page_moved, dispatch_uid='wagtailnest_check_page_moved')
+    post_save.connect(
+        update_public_pages, dispatch_uid='wagtailnest_update_public_pages')
+    post_delete.connect(
+        update_public_pages, sender=PageViewRestriction,
+        dispatch_uid='wagtailnest_update_public_pages')
+    # Embeds are only saved by get_embed, which EmbedCache already sees
+    post_delete.connect(
+        remove_from_embed_cache, sender=Embed,
+        dispatch_uid='wagtailnest_remove_from_embed_cache')
+    # Page URLs, images, documents and embeds are baked into converted HTML
+    for signal in [post_save, post_delete]:
+        signal.connect(
+            clear_richtext_cache,
+            dispatch_uid='wagtailnest_clear_richtext_cache')
+    for signal in [page_published, page_unpublished, post_save]:
+        signal.connect(
+            refresh_snapshot, dispatch_uid='wagtailnest_refresh_snapshot')
+    post_delete.connect(
+        refresh_snapshot, sender=PageViewRestriction,
+        dispatch_uid='wagtailnest_refresh_snapshot')
@@ -0,0 +1,276 @@
+"""Write the published pages API to static, precompressed JSON files.
+
+A snapshot of the default site is laid out for a web server to serve
+without Django::
+
+    pages/index.json              detail of the site root
+    pages/<root_relative_url>/index.json
+    listing.json                  every page in the listing representation
+    urls.json                     root_relative_url -> id, type, url_path
+
+Each file is written next to ``.gz`` and, when the ``brotli`` package is
+installed, ``.br`` copies. ``urls.json`` doubles as the manifest that
+incremental updates use to find files left behind by moves. Exports and
+updates hold a lock on ``.snapshot.lock`` so concurrent ones don't lose
+each other's index entries.
+"""
+import fcntl
+import gzip
+import json
+import logging
+import os
+from contextlib import contextmanager
+from io import BytesIO
+from tempfile import NamedTemporaryFile
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+from wagtail.core.models import Page, Site
+
+from wagtailnest.models import PublicPage
+from wagtailnest.utils import get_root_relative_url
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+
+def compress_gzip(content):
+    buffer = BytesIO()
+    # A fixed mtime keeps unchanged pages byte-identical between runs
+    with gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0) as handle:
+        handle.write(content)
+    return buffer.getvalue()
+
+
+def compress_brotli(content):
+    return brotli.compress(content)
+
+
+COMPRESSORS = {'gzip': ('.gz', compress_gzip), 'br': ('.br', compress_brotli)}
+# Listing page size when WAGTAILAPI_LIMIT_MAX doesn't cap it
+LISTING_LIMIT = 100
+
+
+def public_pages(site):
+    """Live, public pages of ``site``, as the pages endpoint serves them."""
+    qs = Page.objects.all()
+    if settings.WAGTAILNEST.PUBLIC_PAGE_INDEX['ENABLED']:
+        return PublicPage.filter_public(qs, site)
+    return qs.live().public().descendant_of(site.root_page, inclusive=True)
+
+
+class Snapshot:
+    """Render pages through the pages endpoint into ``directory``."""
+
+    def __init__(self, directory, site=None, compress=None):
+        self.directory = directory
+        self.site = site or Site.objects.get(is_default_site=True)
+        if compress is None:
+            compress = settings.WAGTAILNEST.SNAPSHOT['COMPRESS']
+        self.compressors = [
+            COMPRESSORS[name] for name in compress
+            if name != 'br' or brotli is not None]
+        self.factory = RequestFactory(
+            HTTP_HOST=self.site.hostname, SERVER_PORT=self.site.port)
+        self.written = 0
+
+    def render(self, path, params):
+        """GET the API as an anonymous visitor; returns status and body."""
+        request = self.factory.get(path, params)
+        request.site = self.site
+        request.user = AnonymousUser()
+        match = resolve(path)
+        response = match.func(request, *match.args, **match.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response.status_code, response.content
+
+    def get_path(self, name):
+        return os.path.join(self.directory, *name.split('/'))
+
+    @contextmanager
+    def locked(self):
+        """Hold the snapshot's lock, waiting for other writers."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.get_path('.snapshot.lock'), 'a') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            yield
+
+    @staticmethod
+    def page_name(root_relative_url):
+        return '/'.join(
+            ['pages'] + [part for part in root_relative_url.split('/')
+                         if part] + ['index.json'])
+
+    def write(self, name, content):
+        """Write ``name`` and its compressed copies, if it has changed."""
+        path = self.get_path(name)
+        try:
+            with open(path, 'rb') as handle:
+                if handle.read() == content:
+                    return
+        except OSError:
+            pass
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        files = [('', content)] + [
+            (suffix, compress(content))
+            for suffix, compress in self.compressors]
+        # Compressed copies first, so a server never pairs new with old
+        for suffix, data in reversed(files):
+            with NamedTemporaryFile(
+                    dir=os.path.dirname(path), delete=False) as handle:
+                handle.write(data)
+            os.chmod(handle.name, 0o644)
+            os.replace(handle.name, path + suffix)
+        self.written += 1
+
+    def remove(self, name):
+        path = self.get_path(name)
+        for suffix in [''] + [suffix for suffix, _ in COMPRESSORS.values()]:
+            try:
+                os.remove(path + suffix)
+            except FileNotFoundError:
+                pass
+
+    def write_json(self, name, data):
+        self.write(name, json.dumps(
+            data, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+
+    def load_manifest(self):
+        try:
+            with open(self.get_path('urls.json'), encoding='utf-8') as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def manifest_entry(page):
+        return {
+            'id': page.pk,
+            # pylint: disable=protected-access
+            'type': page.specific_class._meta.label,
+            'url_path': page.url_path,
+        }
+
+    def export_page(self, page):
+        """Write one page's detail response; returns its manifest key."""
+        root_relative_url = get_root_relative_url(page.url_path)
+        status, content = self.render(
+            reverse('wagtailapi:pages:listing'), {'url_path': page.url_path})
+        if status != 200:
+            return None
+        self.write(self.page_name(root_relative_url), content)
+        return root_relative_url
+
+    def render_listing(self, params):
+        """Return the listing endpoint's items for ``params``."""
+        status, content = self.render(
+            reverse('wagtailapi:pages:listing'), params)
+        if status != 200:
+            raise ValueError('Listing failed with status {}: {}'.format(
+                status, content[:200]))
+        return json.loads(content.decode('utf-8'))['items']
+
+    def write_listing(self, items):
+        self.write_json('listing.json', {
+            'meta': {'total_count': len(items)}, 'items': items})
+
+    def load_listing(self):
+        try:
+            with open(self.get_path('listing.json'),
+                      encoding='utf-8') as handle:
+                return json.load(handle)['items']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def export_listing(self):
+        """Join the listing endpoint's pages into one listing.json."""
+        limit = getattr(settings, 'WAGTAILAPI_LIMIT_MAX', 20)
+        if limit is None:
+            limit = LISTING_LIMIT
+        items = []  # type: list
+        while True:
+            batch = self.render_listing({
+                'limit': limit, 'offset': len(items), 'order': 'id'})
+            items.extend(batch)
+            if len(batch) < limit:
+                break
+        self.write_listing(items)
+
+    def update_listing(self, ids):
+        """Replace just the items of ``ids`` in listing.json.
+
+        Each page is rendered through ``?id=``; pages no longer listed
+        render no item and are dropped.
+        """
+        items = self.load_listing()
+        if items is None:
+            self.export_listing()
+            return
+        items = [item for item in items if item['id'] not in ids]
+        for page_id in ids:
+            items.extend(self.render_listing({'id': page_id}))
+        items.sort(key=lambda item: item['id'])
+        self.write_listing(items)
+
+    def export_all(self):
+        """Write every public page and the indexes; prune stale files."""
+        with self.locked():
+            return self._export_all()
+
+    def _export_all(self):
+        manifest = {}
+        for page in public_pages(self.site).specific().iterator():
+            key = self.export_page(page)
+            if key is not None:
+                manifest[key] = self.manifest_entry(page)
+        for key in set(self.load_manifest()) - set(manifest):
+            self.remove(self.page_name(key))
+        self.export_listing()
+        self.write_json('urls.json', manifest)
+        return len(manifest)
+
+    def update(self, pages):
+        """Rewrite just ``pages``, and descendants of any that moved."""
+        with self.locked():
+            return self._update(pages)
+
+    def _update(self, pages):
+        manifest = self.load_manifest()
+        by_id = {entry['id']: key for key, entry in manifest.items()}
+        ids = set()
+        for page in pages:
+            ids.add(page.pk)
+            old_key = by_id.get(page.pk)
+            if old_key is not None and manifest[old_key][
+                    'url_path'] != page.url_path:
+                ids.update(Page.objects.descendant_of(page).values_list(
+                    'pk', flat=True))
+        stale = {by_id[page_id] for page_id in ids if page_id in by_id}
+        for key in stale:
+            del manifest[key]
+        for page in public_pages(self.site).filter(
+                pk__in=ids).specific().iterator():
+            key = self.export_page(page)
+            if key is not None:
+                manifest[key] = self.manifest_entry(page)
+        # Only after writing, so pages keeping their URL never go missing
+        for key in stale - set(manifest):
+            self.remove(self.page_name(key))
+        self.update_listing(ids)
+        self.write_json('urls.json', manifest)
+        return len(ids)
+
+
+def update_snapshot(pages):
+    """Refresh the configured snapshot for ``pages``, logging failures."""
+    try:
+        Snapshot(settings.WAGTAILNEST.SNAPSHOT['DIRECTORY']).update(pages)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception('Could not update the snapshot')
@@ -1,20 +1,39 @@
+from collections import defaultdict
 from functools import wraps
 
 from dj_core.utils import as_absolute
 from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q, prefetch_related_objects
 from django.urls import reverse
 from rest_framework.settings import perform_import
-from wagtail.core.blocks import RichTextBlock
-from wagtail.core.models import Site, UserPagePermissionsProxy
-from wagtail.images.formats import get_image_formats
+from wagtail.core.models import GroupPagePermission, Page, Site
+from wagtail.images.formats import get_image_format
 
+from wagtailnest.cache import (get_permission_cache, get_signature_cache,
+                               site_registry)
+from wagtailnest.richtext import get_richtext_converter
 
-def get_site():
-    site = Site.objects.filter(pk=settings.SITE_ID).first()
+
+def _resolve_site():
+    sites = Site.objects.select_related('root_page')
+    site = sites.filter(pk=settings.SITE_ID).first()
     if site is None:
-        site = Site.objects.filter(
-            hostname=settings.DJCORE.URL.hostname).first()
-    return site or Site.objects.first()
+        site = sites.filter(hostname=settings.DJCORE.URL.hostname).first()
+    return site or sites.first()
+
+
+def get_site():
+    """Get the default Site, resolved once per process and hostname."""
+    return site_registry.get_site(
+        settings.DJCORE.URL.hostname, _resolve_site)
+
+
+def get_root_url_path():
+    """Get the default Site's root page url_path."""
+    return site_registry.get_root_url_path(
+        settings.DJCORE.URL.hostname, _resolve_site)
 
 
 def _clean_rel_url(rel_url):
@@ -29,40 +48,186 @@ def get_root_relative_url(url_path):
 def get_url_path(root_relative_url):
     """Add the root page slug to the URL path"""
     return _clean_rel_url('/'.join(
-        [get_site().root_page.url_path.strip('/')] +
+        [get_root_url_path().strip('/')] +
         [s for s in root_relative_url.split('/') if s != '']))
 
 
-def publishable_pages(user, qs=None):
-    publishable = UserPagePermissionsProxy(user).publishable_pages()
+def get_relation_field_names(model, field_names):
+    """Filter field names down to those which are relations on the model."""
+    relations = []
+    for name in field_names:
+        try:
+            # pylint: disable=protected-access
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        if field.is_relation:
+            relations.append(name)
+    return relations
+
+
+def get_api_field_sources(model, field_names):
+    """Extend ``field_names`` with the attributes their APIFields read."""
+    names = set(field_names)
+    for api_field in getattr(model, 'api_fields', None) or ():
+        serializer = getattr(api_field, 'serializer', None)
+        source = getattr(serializer, 'source', None)
+        if getattr(api_field, 'name', None) in names and source:
+            names.add(source.split('.')[0])
+    return names
+
+
+def get_deferred_field_names(model, field_names, keep_fields=()):
+    """Name the large columns that serializing ``field_names`` won't read.
+
+    Only text columns, StreamFields among them, are deferred: they are what
+    make rows heavy, and reading any other deferred column later costs a
+    query per row. Attributes in ``keep_fields`` or the model's
+    ``embed_url_fields`` are always loaded.
+    """
+    if not settings.WAGTAILNEST.PROJECTION['ENABLED']:
+        return []
+    wanted = get_api_field_sources(model, field_names)
+    wanted.update(keep_fields)
+    wanted.update(getattr(model, 'embed_url_fields', ()))
+    return [
+        # pylint: disable=protected-access
+        field.name for field in model._meta.concrete_fields
+        if field.get_internal_type() in ('TextField', 'BinaryField') and
+        not field.primary_key and field.name not in wanted]
+
+
+def prefetch_relations(instances, field_names):
+    """Prefetch each named relation, skipping those Django can't prefetch."""
+    for name in field_names:
+        try:
+            prefetch_related_objects(instances, name)
+        except (AttributeError, ValueError):
+            continue
+
+
+def specific_pages(pages, field_names=(), keep_fields=None):
+    """Swap pages for their specific instances, one query per page type.
+
+    Relations among ``field_names`` are prefetched per type as well, so a
+    serializer walking the result doesn't query per row. Given
+    ``keep_fields``, large columns outside both lists are deferred.
+    """
+    pages = list(pages)
+    pages_by_type = defaultdict(list)
+    for page in pages:
+        pages_by_type[page.content_type_id].append(page)
+    specific = {}
+    for content_type_id, typed_pages in pages_by_type.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        if model is None:
+            continue
+        if any(type(page) is not model for page in typed_pages):
+            queryset = model.objects.filter(
+                pk__in=[page.pk for page in typed_pages])
+            if keep_fields is not None:
+                queryset = queryset.defer(*get_deferred_field_names(
+                    model, field_names, keep_fields))
+            typed_pages = list(queryset)
+        prefetch_relations(
+            typed_pages, get_relation_field_names(model, field_names))
+        specific.update((page.pk, page) for page in typed_pages)
+    return [specific.get(page.pk, page) for page in pages]
+
+
+def _resolve_publishable_paths(user):
+    if not user.is_active:
+        return (False, frozenset())
+    if user.is_superuser:
+        return (True, frozenset())
+    paths = sorted(GroupPagePermission.objects.filter(
+        group__user=user, permission_type='publish',
+    ).values_list('page__path', flat=True))
+    prefixes = []
+    for path in paths:  # Sorted, so ancestors come before their descendants
+        if not any(path.startswith(prefix) for prefix in prefixes):
+            prefixes.append(path)
+    return (False, frozenset(prefixes))
+
+
+def get_publishable_paths(user):
+    """Get ``(all_pages, path_prefixes)`` for the pages a user can publish.
+
+    Derived from the user's group page permissions and cached per user until
+    a GroupPagePermission, the user or their groups change.
+    """
+    permission_cache = get_permission_cache()
+    if permission_cache is None or user.pk is None:
+        return _resolve_publishable_paths(user)
+    paths = permission_cache.get(user.pk)
+    if paths is None:
+        paths = _resolve_publishable_paths(user)
+        permission_cache.set(user.pk, paths)
+    return paths
+
+
+def publishable_pages(user, qs=None, path_field='path'):
+    """Narrow ``qs`` to what ``user`` can publish, by tree path prefix.
+
+    ``path_field`` names the page path on ``qs``'s model, so rows related
+    to pages can be filtered through a join, e.g. ``page__path``.
+    """
+    all_pages, prefixes = get_publishable_paths(user)
     if qs is None:
-        return publishable
-    return qs.filter(id__in=publishable.values_list('pk', flat=True))
+        qs = Page.objects.all()
+    if all_pages:
+        return qs
+    if not prefixes:
+        return qs.none()
+    query = Q()
+    lookup = '{}__startswith'.format(path_field)
+    for prefix in prefixes:
+        query |= Q(**{lookup: prefix})
+    return qs.filter(query)
 
 
 def can_publish(user, page):
-    return page.pk in publishable_pages(user).values_list('pk', flat=True)
+    """Check ``page`` against the user's publishable path prefixes."""
+    all_pages, prefixes = get_publishable_paths(user)
+    return all_pages or any(
+        page.path.startswith(prefix) for prefix in prefixes)
+
+
+def get_image_signature(image_id, filter_spec):
+    """Sign an image URL, remembering recent signatures."""
+    from wagtail.images.views.serve import generate_signature
+    signatures = get_signature_cache()
+    key = (str(image_id), filter_spec)
+    signature = signatures.get(key)
+    if signature is None:
+        signature = generate_signature(image_id, filter_spec)
+        signatures.set(key, signature)
+    return signature
 
 
 def generate_image_url(image, filter_spec):
     """From an Image, get a URL."""
-    from wagtail.images.views.serve import generate_signature
-    signature = generate_signature(image.id, filter_spec)
+    signature = get_image_signature(image.id, filter_spec)
     name = 'wagtailimages_serve'
     url = reverse(name, args=(signature, image.id, filter_spec))
     return as_absolute(url)
 
 
 def get_image_filter_spec(profile_name):
-    profiles = {x.name: x for x in get_image_formats()}
-    return getattr(profiles.get(profile_name, None), 'filter_spec', 'original')
+    try:
+        return get_image_format(profile_name).filter_spec
+    except KeyError:
+        return 'original'
 
 
 def richtext_to_python(value):
     """Convert a RichText rendered string back into RichText."""
-    if isinstance(value, str):
-        return str(RichTextBlock().to_python(value))
-    return value
+    return get_richtext_converter().convert(value)
+
+
+def richtexts_to_python(values):
+    """Convert many strings as richtext_to_python does, in one pass."""
+    return get_richtext_converter().convert_many(values)
 
 
 def serialize_video_url(video_url):
@@ -70,6 +235,28 @@ def serialize_video_url(video_url):
     return EmbedSerializer.for_url(video_url)
 
 
+def get_embed_urls(pages):
+    """Collect the URLs that ``pages`` serialize via serialize_video_url.
+
+    Page models name the attributes holding them in ``embed_url_fields``.
+    """
+    urls = set()
+    for page in pages:
+        for name in getattr(page, 'embed_url_fields', ()):
+            url = getattr(page, name, '')
+            if url:
+                urls.add(url)
+    return urls
+
+
+def prefetch_embeds(pages):
+    """Resolve every embed ``pages`` will serialize in one pass."""
+    urls = get_embed_urls(pages)
+    if urls and settings.WAGTAILNEST.EMBED_CACHE['ENABLED']:
+        from wagtailnest.serializers import EmbedSerializer
+        EmbedSerializer.for_urls(urls)
+
+
 def import_setting(name, default=None):
     value = perform_import(settings.WAGTAILNEST.get(name, None), name)
     return default if value is None else value
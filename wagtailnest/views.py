@@ -1,13 +1,23 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseRedirect
+from django.utils.cache import add_never_cache_headers
+from django.utils.crypto import constant_time_compare
 from django.views.generic.base import RedirectView
 from rest_framework.generics import RetrieveAPIView
 from rest_framework.settings import api_settings
 from wagtail.core.models import Page
 from wagtail.core.views import serve as serve_page
 from wagtail.documents.views.serve import serve as serve_doc
-from wagtail.images.views.serve import ServeView, generate_signature
+from wagtail.images import get_image_model
+from wagtail.images.exceptions import InvalidFilterSpecError
+from wagtail.images.models import Filter
+from wagtail.images.views.serve import ServeView
 
-from wagtailnest.utils import (get_image_filter_spec, get_root_relative_url,
-                               import_setting)
+from wagtailnest.documents import serve as serve_document
+from wagtailnest.instrumentation import InstrumentedViewMixin
+from wagtailnest.renditions import get_rendition_queue
+from wagtailnest.utils import (get_image_filter_spec, get_image_signature,
+                               get_root_relative_url, import_setting)
 
 _permissions = {
     name: import_setting(
@@ -16,10 +26,14 @@ _permissions = {
     for name in ['PAGE', 'DOCUMENT', 'IMAGE']
 }
 
+serve_image = ServeView.as_view()
 
-class DraftRedirectView(RedirectView):
+
+class DraftRedirectView(InstrumentedViewMixin, RedirectView):
     """View that redirects to the correct URL for a draft."""
 
+    metrics_name = 'draft_redirect'
+
     # pylint: disable=unused-argument
     def get_redirect_url(self, *args, **kwargs):
         page = Page.objects.filter(pk=self.kwargs.get('pk', None)).first()
@@ -27,9 +41,11 @@ class DraftRedirectView(RedirectView):
         return '{}?preview=True'.format(get_root_relative_url(url_path))
 
 
-class RevisionRedirectView(RedirectView):
+class RevisionRedirectView(InstrumentedViewMixin, RedirectView):
     """View that redirects to the correct URL for a revision."""
 
+    metrics_name = 'revision_redirect'
+
     # pylint: disable=unused-argument
     def get_redirect_url(self, *args, **kwargs):
         page = Page.objects.filter(pk=self.kwargs.get('pk', None)).first()
@@ -38,9 +54,10 @@ class RevisionRedirectView(RedirectView):
         return '{}?revision={}'.format(get_root_relative_url(url_path), rpk)
 
 
-class PageServeView(RetrieveAPIView):
+class PageServeView(InstrumentedViewMixin, RetrieveAPIView):
     """View which serves a rendered page."""
 
+    metrics_name = 'page_serve'
     permission_classes = _permissions['PAGE']
 
     # pylint: disable=no-self-use,arguments-differ
@@ -48,28 +65,64 @@ class PageServeView(RetrieveAPIView):
         return serve_page(request, path)
 
 
-class DocumentServeView(RetrieveAPIView):
+class DocumentServeView(InstrumentedViewMixin, RetrieveAPIView):
     """View which serves a document."""
 
+    metrics_name = 'document_serve'
     permission_classes = _permissions['DOCUMENT']
 
     # pylint: disable=no-self-use,arguments-differ
     def get(self, request, document_id, document_filename=None):
+        if settings.WAGTAILNEST.DOCUMENTS['STREAMING']:
+            return serve_document(request, document_id, document_filename)
         return serve_doc(request, document_id, document_filename)
 
 
-class ImageServeView(RetrieveAPIView):
+class ImageServeView(InstrumentedViewMixin, RetrieveAPIView):
     """View which serves an image."""
 
+    metrics_name = 'image_serve'
     permission_classes = _permissions['IMAGE']
 
-    def get(self, request, *args, **kwargs):  # pylint: disable=no-self-use
+    def get(self, request, *args, **kwargs):
         pk = kwargs.pop('pk', None)
         if pk is not None:
-            request.GET = request.GET.copy()  # QueryDict is immutable
             filter_spec = get_image_filter_spec(
                 request.GET.get('filter_spec', None))
-            request.GET.pop('filter_spec', None)
-            signature = generate_signature(pk, filter_spec)
-            args = (signature, pk, filter_spec)
-        return ServeView.as_view()(request, *args)
+            args = (get_image_signature(pk, filter_spec), pk, filter_spec)
+        if settings.WAGTAILNEST.RENDITIONS['ASYNC']:
+            response = self.get_pending_response(*args)
+            if response is not None:
+                return response
+        return serve_image(request, *args)
+
+    # pylint: disable=no-self-use
+    def get_pending_response(self, signature, image_id, filter_spec):
+        """Queue a missing rendition and return a placeholder response.
+
+        Returns None when the rendition exists, or when the request is bad in
+        a way ServeView already reports, so it can be served as usual.
+        """
+        if not constant_time_compare(
+                signature, get_image_signature(image_id, filter_spec)):
+            return None
+        image = get_image_model().objects.filter(pk=image_id).first()
+        if image is None:
+            return None
+        try:
+            image_filter = Filter(spec=filter_spec)
+            focal_point_key = image_filter.get_cache_key(image)
+        except (InvalidFilterSpecError, ValueError):
+            return None
+        if image.renditions.filter(
+                filter_spec=image_filter.spec,
+                focal_point_key=focal_point_key).exists():
+            return None
+        get_rendition_queue().submit(image.pk, filter_spec)
+        if settings.WAGTAILNEST.RENDITIONS['PLACEHOLDER'] == 'original':
+            response = HttpResponseRedirect(image.file.url)
+        else:
+            response = HttpResponse(status=202)
+            response['Retry-After'] = 1
+        add_never_cache_headers(response)
+        return response